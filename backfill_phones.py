@@ -0,0 +1,62 @@
+"""Copy the distinct phone numbers of existing call logs into app-phones.
+
+GET /phones serves app-phones only after this has run (PHONES_INDEX_READY=1,
+terraform var phones_index_ready). New logs are indexed on write, so run it
+once after the first deploy that created the table, then flip the flag:
+
+    python backfill_phones.py                      # every tenant (Scan)
+    python backfill_phones.py --client-id ueki     # one tenant (TsIndex Query)
+
+Re-running is safe: puts are idempotent.
+"""
+import argparse
+import os
+import sys
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+# Same normalization the Lambdas apply on write
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lambda", "ueki_calllogs"))
+from handler import _normalize_phone_number  # noqa: E402
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-northeast-1")
+
+
+def _pages(table, client_id: Optional[str]) -> Iterator[Dict[str, Any]]:
+    kwargs: Dict[str, Any] = {"ProjectionExpression": "client_id, phone_number"}
+    if client_id:
+        kwargs.update(IndexName="TsIndex", KeyConditionExpression=Key("client_id").eq(client_id))
+    while True:
+        r = table.query(**kwargs) if client_id else table.scan(**kwargs)
+        yield r
+        if not r.get("LastEvaluatedKey"):
+            return
+        kwargs["ExclusiveStartKey"] = r["LastEvaluatedKey"]
+
+
+def backfill(logs_table_name: str, phones_table_name: str, client_id: Optional[str] = None) -> int:
+    ddb = boto3.resource("dynamodb", region_name=AWS_REGION)
+    logs = ddb.Table(logs_table_name)
+    seen: Set[Tuple[str, str]] = set()
+    with ddb.Table(phones_table_name).batch_writer(overwrite_by_pkeys=["client_id", "phone_number"]) as bw:
+        for page in _pages(logs, client_id):
+            for it in page.get("Items", []):
+                cid = it.get("client_id")
+                phone = _normalize_phone_number(it.get("phone_number"))
+                if not cid or not phone or (cid, phone) in seen:
+                    continue
+                seen.add((cid, phone))
+                bw.put_item(Item={"client_id": cid, "phone_number": phone})
+    return len(seen)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill app-phones from the call log table")
+    parser.add_argument("--logs-table", default=os.getenv("CALL_LOGS_TABLE_NAME", "app-logs"))
+    parser.add_argument("--phones-table", default=os.getenv("PHONES_TABLE_NAME", "app-phones"))
+    parser.add_argument("--client-id", help="Only this tenant (queries TsIndex instead of scanning)")
+    a = parser.parse_args()
+    n = backfill(a.logs_table, a.phones_table, a.client_id)
+    print(f"indexed {n} phone numbers into {a.phones_table}")
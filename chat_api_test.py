@@ -2,9 +2,25 @@ import json
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
-from urllib import request, parse, error
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib import parse
+
+import urllib3
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:  # fall back to stdlib json
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    _loads = json.loads
 
 
 API_ENDPOINT = os.getenv(
@@ -12,48 +28,74 @@ API_ENDPOINT = os.getenv(
     "https://so0hxmjon8.execute-api.ap-northeast-1.amazonaws.com",
 ).rstrip("/")
 
+# Opt-in HTTP/2 (API_HTTP2=1): needs urllib3>=2.3 with the h2 package, otherwise HTTP/1.1 is kept.
+if os.getenv("API_HTTP2") == "1":
+    try:
+        import urllib3.http2
+
+        urllib3.http2.inject_into_urllib3()
+    except ImportError:
+        pass
+
+# Shared keep-alive pool so repeated calls reuse the TCP+TLS connection.
+_POOL = urllib3.PoolManager(num_pools=1, maxsize=8, block=False)
+# Parse API_ENDPOINT once: requests go to the host's pool with a plain path.
+_API_CONN = _POOL.connection_from_url(API_ENDPOINT)
+_API_PREFIX = parse.urlsplit(API_ENDPOINT).path
+# Sent on every call; urllib3 copies it per request, so sharing it is safe.
+_DEFAULT_HEADERS = {"content-type": "application/json"}
+# Worker threads for overlapping independent requests (sized to the pool).
+_IO_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+# (epoch second, ISO string) of the last formatted timestamp
+_ts_cache: Tuple[int, str] = (0, "")
+
 
 def _now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+    # Second resolution: re-format only when the wall-clock second changes.
+    global _ts_cache
+    sec = int(time.time())
+    cached = _ts_cache
+    if cached[0] != sec:
+        cached = (sec, datetime.fromtimestamp(sec, timezone.utc).isoformat(timespec="seconds"))
+        _ts_cache = cached
+    return cached[1]
 
 
 def http_call(method: str, path: str, body: Optional[Dict[str, Any]] = None, qs: Optional[Dict[str, Any]] = None, timeout: int = 15) -> Tuple[int, Dict[str, Any]]:
-    url = f"{API_ENDPOINT}{path}"
+    url = _API_PREFIX + path
     if qs:
-        qstr = parse.urlencode(qs)
-        url = f"{url}?{qstr}"
+        url += "?" + parse.urlencode(qs)
 
     data = None
-    headers = {"content-type": "application/json"}
     if body is not None:
-        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        data = _dumps(body)
 
-    req = request.Request(url=url, data=data, headers=headers, method=method.upper())
     try:
-        with request.urlopen(req, timeout=timeout) as resp:
-            raw = resp.read()
-            status = resp.getcode()
-            try:
-                js = json.loads(raw.decode("utf-8") or "{}")
-            except Exception:
-                js = {"_raw": raw.decode("utf-8", errors="replace")}
-            return status, js
-    except error.HTTPError as e:
-        raw = e.read()
-        try:
-            js = json.loads(raw.decode("utf-8") or "{}")
-        except Exception:
-            js = {"_raw": raw.decode("utf-8", errors="replace")}
-        return e.code, js
+        resp = _API_CONN.request(method.upper(), url, body=data, headers=_DEFAULT_HEADERS, timeout=timeout)
     except Exception as e:
         return 0, {"error": str(e)}
+    raw = resp.data
+    try:
+        js = _loads(raw or b"{}")
+    except Exception:
+        js = {"_raw": raw.decode("utf-8", errors="replace")}
+    return resp.status, js
+
+
+def gather_calls(*calls: Tuple[Any, ...]) -> List[Tuple[int, Dict[str, Any]]]:
+    """Run independent http_call(*args) requests concurrently, returning results in order."""
+    futures = [_IO_POOL.submit(http_call, *args) for args in calls]
+    return [f.result() for f in futures]
 
 
 def assert_ok(label: str, status: int, js: Dict[str, Any]) -> None:
     if status != 200 or not js.get("ok", True):
-        print(f"[FAIL] {label}: status={status} body={json.dumps(js, ensure_ascii=False)}")
+        print(f"[FAIL] {label}: status={status} body={_dumps(js).decode('utf-8')}")
         sys.exit(1)
-    print(f"[OK] {label}")
+    # one write() per line: no format step, and lines from concurrent suites don't interleave
+    sys.stdout.write("[OK] " + label + "\n")
 
 
 def test_prompt_api() -> None:
@@ -86,13 +128,14 @@ def test_prompt_api() -> None:
 def test_faq_crud() -> None:
     print("\n=== FAQ CRUD ===")
     q = f"営業時間は？(test:{int(time.time())})"
+    q_enc = parse.quote(q)
 
     # create
     s, js = http_call("POST", "/faq", {"question": q, "answer": "10:00〜19:00です。"})
     assert_ok("FAQ create", s, js)
 
     # get
-    s, js = http_call("GET", f"/faq/{parse.quote(q)}")
+    s, js = http_call("GET", f"/faq/{q_enc}")
     assert_ok("FAQ get", s, js)
 
     # list
@@ -100,11 +143,11 @@ def test_faq_crud() -> None:
     assert_ok("FAQ list", s, js)
 
     # update
-    s, js = http_call("PUT", f"/faq/{parse.quote(q)}", {"answer": "10:00〜19:00、年中無休。"})
+    s, js = http_call("PUT", f"/faq/{q_enc}", {"answer": "10:00〜19:00、年中無休。"})
     assert_ok("FAQ update", s, js)
 
     # delete
-    s, js = http_call("DELETE", f"/faq/{parse.quote(q)}")
+    s, js = http_call("DELETE", f"/faq/{q_enc}")
     assert_ok("FAQ delete", s, js)
 
 
@@ -123,21 +166,17 @@ def test_calllogs_crud() -> None:
     })
     assert_ok("Call create", s, js)
 
-    # get one (by PK)
-    s, js = http_call("GET", "/call", None, {"phone": phone, "ts": ts})
-    assert_ok("Call get (pk)", s, js)
-
-    # get one (by call_sid)
-    s, js = http_call("GET", "/call", None, {"call_sid": "TEST-SID-12345"})
-    assert_ok("Call get (call_sid)", s, js)
-
-    # list by phone
-    s, js = http_call("GET", "/calls", None, {"phone": phone, "limit": 10})
-    assert_ok("Call list", s, js)
-
-    # phones
-    s, js = http_call("GET", "/phones")
-    assert_ok("Phones list", s, js)
+    # read-only checks are independent of each other, so overlap them
+    (s_pk, js_pk), (s_sid, js_sid), (s_list, js_list), (s_ph, js_ph) = gather_calls(
+        ("GET", "/call", None, {"phone": phone, "ts": ts}),       # get one (by PK)
+        ("GET", "/call", None, {"call_sid": "TEST-SID-12345"}),   # get one (by call_sid)
+        ("GET", "/calls", None, {"phone": phone, "limit": 10}),   # list by phone
+        ("GET", "/phones"),                                        # phones
+    )
+    assert_ok("Call get (pk)", s_pk, js_pk)
+    assert_ok("Call get (call_sid)", s_sid, js_sid)
+    assert_ok("Call list", s_list, js_list)
+    assert_ok("Phones list", s_ph, js_ph)
 
     # update (assistant_text + call_sid change)
     s, js = http_call("PUT", "/call", {
@@ -158,18 +197,29 @@ def test_chat() -> None:
     phone = "09012345678"
     s, js = http_call("POST", "/chat", {"phone_number": phone, "user_text": "予約したいです"}, None, timeout=30)
     if s != 200 or not js.get("ok"):
-        print(f"[FAIL] Chat: status={s} body={json.dumps(js, ensure_ascii=False)}")
+        print(f"[FAIL] Chat: status={s} body={_dumps(js).decode('utf-8')}")
         sys.exit(1)
     reply = js.get("reply", "")
     print(f"[OK] Chat reply: {reply[:100]}{'...' if len(reply) > 100 else ''}")
 
 
+def run_suites(suites: List[Callable[[], None]]) -> None:
+    """Run independent test suites concurrently; a failing suite's SystemExit propagates."""
+    if not suites:
+        return
+    with ThreadPoolExecutor(max_workers=len(suites)) as ex:
+        futures = [ex.submit(suite) for suite in suites]
+        for f in futures:
+            f.result()
+
+
 if __name__ == "__main__":
     print(f"API_ENDPOINT: {API_ENDPOINT}")
-    #test_prompt_api()
-    #test_faq_crud()
-    test_calllogs_crud()
-    #test_chat()
+    # Suites target distinct resources, so they can overlap their round-trips.
+    run_suites([
+        #test_prompt_api,
+        #test_faq_crud,
+        test_calllogs_crud,
+        #test_chat,
+    ])
     print("\nAll tests passed.")
-
-
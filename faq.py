@@ -1,63 +1,138 @@
 import os
+import threading
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List, Tuple
 
 import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
+try:
+    import amazondax
+except ImportError:  # DAX is optional; plain DynamoDB is used without it
+    amazondax = None
+
 
 AWS_REGION = os.getenv("AWS_REGION", "ap-northeast-1")
 FAQ_TABLE_NAME = os.getenv("FAQ_TABLE_NAME", "ueki-faq")
-
-_ddb_resource = None
-_faq_table = None
-
-
-def _get_table():
-    global _ddb_resource, _faq_table
-    if _faq_table is not None:
-        return _faq_table
+# When set (e.g. "dax://my-cluster.xxxx.dax-clusters.ap-northeast-1.amazonaws.com"),
+# reads and writes go through the DAX cluster's item/query cache.
+DAX_ENDPOINT = os.getenv("DAX_ENDPOINT")
+# Every FAQ item carries type="faq" so list_faqs can Query a single GSI partition
+# (PK=type, SK=updated_at) instead of scanning the whole table.
+FAQ_TYPE_INDEX = os.getenv("FAQ_TYPE_INDEX", "by_type")
+FAQ_ITEM_TYPE = "faq"
+_CCFE = "ConditionalCheckFailedException"
+# Query errors meaning FAQ_TYPE_INDEX is missing or still backfilling
+_INDEX_UNAVAILABLE = ("ValidationException", "ResourceNotFoundException")
+
+# Larger keep-alive pool for concurrent callers; adaptive retries back off on throttling.
+_DDB_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 3},
+)
+
+
+def _init_table(new_session: bool = False):
+    """Build the FAQ table once at import; None if boto3/DAX setup fails."""
     try:
-        _ddb_resource = boto3.resource("dynamodb", region_name=AWS_REGION)
-        _faq_table = _ddb_resource.Table(FAQ_TABLE_NAME)
-        return _faq_table
+        if DAX_ENDPOINT and amazondax is not None:
+            resource = amazondax.AmazonDaxClient.resource(endpoint_url=DAX_ENDPOINT, region_name=AWS_REGION)
+        else:
+            factory = boto3.session.Session() if new_session else boto3
+            resource = factory.resource("dynamodb", region_name=AWS_REGION, config=_DDB_CONFIG)
+        return resource.Table(FAQ_TABLE_NAME)
     except Exception:
         return None
 
 
+_FAQ_TABLE = _init_table()
+_tls = threading.local()
+
+
+def _thread_table():
+    """_FAQ_TABLE on the main thread; elsewhere a per-thread table on its own session.
+
+    boto3 sessions and resources are not thread-safe, and parallel-scan
+    callers run one worker thread per segment.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return _FAQ_TABLE
+    table = getattr(_tls, "table", None)
+    if table is None:
+        table = _tls.table = _init_table(new_session=True)
+    return table
+
+
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 
+def _projection_kwargs(fields: Optional[List[str]]) -> Dict[str, Any]:
+    """ProjectionExpression kwargs for the given attributes (#-aliased to avoid reserved words)."""
+    if not fields:
+        return {}
+    names = {f"#f{i}": f for i, f in enumerate(fields)}
+    return {"ProjectionExpression": ",".join(names), "ExpressionAttributeNames": names}
+
+
 def create_faq(question: str, answer: str) -> Dict[str, Any]:
     """Create a new FAQ item. Fails if the question already exists."""
-    table = _get_table()
-    if table is None:
+    if _FAQ_TABLE is None:
         return {"ok": False, "error": "DynamoDB table not available"}
+    now = _now_iso()
     item = {
         "question": question,
         "answer": answer,
-        "created_at": _now_iso(),
-        "updated_at": _now_iso(),
+        "type": FAQ_ITEM_TYPE,
+        "created_at": now,
+        "updated_at": now,
     }
     try:
-        table.put_item(Item=item, ConditionExpression="attribute_not_exists(question)")
+        _FAQ_TABLE.put_item(Item=item, ConditionExpression="attribute_not_exists(question)")
         return {"ok": True, "item": item}
     except ClientError as e:
-        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+        if e.response["Error"]["Code"] == _CCFE:
             return {"ok": False, "error": "Question already exists"}
         return {"ok": False, "error": str(e)}
-    except (BotoCoreError, Exception) as e:
+    except BotoCoreError as e:
         return {"ok": False, "error": str(e)}
 
 
-def get_faq(question: str) -> Optional[Dict[str, Any]]:
-    """Get an FAQ item by question. Returns None if not found."""
-    table = _get_table()
-    if table is None:
+def create_faqs_bulk(items: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Put many (question, answer) pairs via BatchWriteItem. Existing questions are overwritten.
+
+    batch_writer() chunks requests at 25 items and resends unprocessed items.
+    """
+    if _FAQ_TABLE is None:
+        return {"ok": False, "error": "DynamoDB table not available"}
+    now = _now_iso()
+    try:
+        with _FAQ_TABLE.batch_writer(overwrite_by_pkeys=["question"]) as bw:
+            for question, answer in items:
+                bw.put_item(Item={
+                    "question": question,
+                    "answer": answer,
+                    "type": FAQ_ITEM_TYPE,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+        return {"ok": True, "count": len(items)}
+    except (BotoCoreError, ClientError) as e:
+        return {"ok": False, "error": str(e)}
+
+
+def get_faq(question: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Get an FAQ item by question. Returns None if not found.
+
+    If fields is given, only those attributes are fetched.
+    """
+    if _FAQ_TABLE is None:
         return None
     try:
-        resp = table.get_item(Key={"question": question})
+        resp = _FAQ_TABLE.get_item(Key={"question": question}, **_projection_kwargs(fields))
         return resp.get("Item")
     except (BotoCoreError, ClientError):
         return None
@@ -65,58 +140,131 @@ def get_faq(question: str) -> Optional[Dict[str, Any]]:
 
 def update_faq(question: str, answer: str) -> Dict[str, Any]:
     """Update the answer for an existing question."""
-    table = _get_table()
-    if table is None:
+    if _FAQ_TABLE is None:
         return {"ok": False, "error": "DynamoDB table not available"}
     try:
-        resp = table.update_item(
+        resp = _FAQ_TABLE.update_item(
             Key={"question": question},
-            UpdateExpression="SET answer = :a, updated_at = :u",
+            # also (re)set type so items written before the GSI existed get indexed
+            UpdateExpression="SET answer = :a, updated_at = :u, #t = :t",
+            ExpressionAttributeNames={"#t": "type"},
             ExpressionAttributeValues={
                 ":a": answer,
                 ":u": _now_iso(),
+                ":t": FAQ_ITEM_TYPE,
             },
             ConditionExpression="attribute_exists(question)",
             ReturnValues="ALL_NEW",
         )
         return {"ok": True, "item": resp.get("Attributes")}
     except ClientError as e:
-        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+        if e.response["Error"]["Code"] == _CCFE:
             return {"ok": False, "error": "Question not found"}
         return {"ok": False, "error": str(e)}
-    except (BotoCoreError, Exception) as e:
+    except BotoCoreError as e:
+        return {"ok": False, "error": str(e)}
+
+
+def upsert_faq(question: str, answer: str) -> Dict[str, Any]:
+    """Create or update an FAQ in a single UpdateItem call (keeps the original created_at)."""
+    if _FAQ_TABLE is None:
+        return {"ok": False, "error": "DynamoDB table not available"}
+    try:
+        _FAQ_TABLE.update_item(
+            Key={"question": question},
+            UpdateExpression="SET answer = :a, updated_at = :u, created_at = if_not_exists(created_at, :u), #t = :t",
+            ExpressionAttributeNames={"#t": "type"},
+            ExpressionAttributeValues={
+                ":a": answer,
+                ":u": _now_iso(),
+                ":t": FAQ_ITEM_TYPE,
+            },
+            ReturnValues="NONE",
+        )
+        return {"ok": True}
+    except (BotoCoreError, ClientError) as e:
         return {"ok": False, "error": str(e)}
 
 
 def delete_faq(question: str) -> Dict[str, Any]:
     """Delete an FAQ item by question."""
-    table = _get_table()
-    if table is None:
+    if _FAQ_TABLE is None:
         return {"ok": False, "error": "DynamoDB table not available"}
     try:
-        table.delete_item(
+        _FAQ_TABLE.delete_item(
             Key={"question": question},
             ConditionExpression="attribute_exists(question)",
         )
         return {"ok": True}
     except ClientError as e:
-        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+        if e.response["Error"]["Code"] == _CCFE:
             return {"ok": False, "error": "Question not found"}
         return {"ok": False, "error": str(e)}
-    except (BotoCoreError, Exception) as e:
+    except BotoCoreError as e:
         return {"ok": False, "error": str(e)}
 
 
-def list_faqs(limit: int = 20, last_evaluated_key: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """Scan FAQs with pagination. Returns {'items': [...], 'last_evaluated_key': ...}.
+def list_faqs(
+    limit: int = 20,
+    last_evaluated_key: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+    segment: Optional[int] = None,
+    total_segments: Optional[int] = None,
+) -> Dict[str, Any]:
+    """List FAQs (newest update first) with pagination. Returns {'items': [...], 'last_evaluated_key': ...}.
+
+    Queries the FAQ_TYPE_INDEX GSI (PK=type, SK=updated_at), so cost scales with
+    the number of FAQs returned rather than the size of the table. Pass fields
+    (e.g. ["question", "updated_at"]) to skip large answers in listing views.
+    Until the index exists (`faq.py create-index`, then `faq.py backfill-type`
+    for older rows) this falls back to an unordered Scan.
 
-    Note: For production, consider using a GSI for categories/tags or a search index.
+    With segment/total_segments, pages through one segment of a parallel Scan
+    instead (unordered); meant for dumping every FAQ with one caller per segment.
     """
-    table = _get_table()
+    if _FAQ_TABLE is None:
+        return {"ok": False, "error": "DynamoDB table not available"}
+    if total_segments:
+        return _scan_page(limit, last_evaluated_key, fields, segment or 0, total_segments)
+    try:
+        query_kwargs: Dict[str, Any] = {
+            "IndexName": FAQ_TYPE_INDEX,
+            "KeyConditionExpression": Key("type").eq(FAQ_ITEM_TYPE),
+            "ScanIndexForward": False,
+            "Limit": limit,
+            **_projection_kwargs(fields),
+        }
+        if last_evaluated_key:
+            query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+        resp = _FAQ_TABLE.query(**query_kwargs)
+        return {
+            "ok": True,
+            "items": resp.get("Items", []),
+            "last_evaluated_key": resp.get("LastEvaluatedKey"),
+        }
+    except ClientError as e:
+        # index not created yet, or still backfilling: fall back to the old unordered Scan
+        if e.response["Error"]["Code"] in _INDEX_UNAVAILABLE:
+            return _scan_page(limit, last_evaluated_key, fields)
+        return {"ok": False, "error": str(e)}
+    except BotoCoreError as e:
+        return {"ok": False, "error": str(e)}
+
+
+def _scan_page(
+    limit: int,
+    last_evaluated_key: Optional[Dict[str, Any]],
+    fields: Optional[List[str]],
+    segment: Optional[int] = None,
+    total_segments: Optional[int] = None,
+) -> Dict[str, Any]:
+    table = _thread_table()
     if table is None:
         return {"ok": False, "error": "DynamoDB table not available"}
     try:
-        scan_kwargs: Dict[str, Any] = {"Limit": limit}
+        scan_kwargs: Dict[str, Any] = {"Limit": limit, **_projection_kwargs(fields)}
+        if total_segments:
+            scan_kwargs.update(Segment=segment, TotalSegments=total_segments)
         if last_evaluated_key:
             scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
         resp = table.scan(**scan_kwargs)
@@ -129,18 +277,85 @@ def list_faqs(limit: int = 20, last_evaluated_key: Optional[Dict[str, Any]] = No
         return {"ok": False, "error": str(e)}
 
 
+def create_type_index() -> Dict[str, Any]:
+    """Add the FAQ_TYPE_INDEX GSI (PK=type, SK=updated_at) that list_faqs queries."""
+    try:
+        # table DDL goes to DynamoDB itself, never through DAX
+        boto3.client("dynamodb", region_name=AWS_REGION, config=_DDB_CONFIG).update_table(
+            TableName=FAQ_TABLE_NAME,
+            AttributeDefinitions=[
+                {"AttributeName": "type", "AttributeType": "S"},
+                {"AttributeName": "updated_at", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexUpdates=[{"Create": {
+                "IndexName": FAQ_TYPE_INDEX,
+                "KeySchema": [
+                    {"AttributeName": "type", "KeyType": "HASH"},
+                    {"AttributeName": "updated_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }}],
+        )
+        return {"ok": True, "index": FAQ_TYPE_INDEX, "status": "CREATING"}
+    except (BotoCoreError, ClientError) as e:
+        return {"ok": False, "error": str(e)}
+
+
+def backfill_type() -> Dict[str, Any]:
+    """Set type (and a missing updated_at) on rows written before the GSI existed, so the index sees them."""
+    if _FAQ_TABLE is None:
+        return {"ok": False, "error": "DynamoDB table not available"}
+    now = _now_iso()
+    count = 0
+    scan_kwargs: Dict[str, Any] = {
+        "ProjectionExpression": "question",
+        "FilterExpression": "attribute_not_exists(#t) OR attribute_not_exists(updated_at)",
+        "ExpressionAttributeNames": {"#t": "type"},
+    }
+    try:
+        while True:
+            resp = _FAQ_TABLE.scan(**scan_kwargs)
+            for it in resp.get("Items", []):
+                _FAQ_TABLE.update_item(
+                    Key={"question": it["question"]},
+                    UpdateExpression="SET #t = :t, updated_at = if_not_exists(updated_at, :u)",
+                    ExpressionAttributeNames={"#t": "type"},
+                    ExpressionAttributeValues={":t": FAQ_ITEM_TYPE, ":u": now},
+                )
+                count += 1
+            if not resp.get("LastEvaluatedKey"):
+                break
+            scan_kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+        return {"ok": True, "count": count}
+    except (BotoCoreError, ClientError) as e:
+        return {"ok": False, "error": str(e), "count": count}
+
+
 __all__ = [
     "create_faq",
+    "create_faqs_bulk",
     "get_faq",
     "update_faq",
+    "upsert_faq",
     "delete_faq",
     "list_faqs",
+    "create_type_index",
+    "backfill_type",
 ]
 
 
 if __name__ == "__main__":
     import argparse
-    import json as _json
+    try:
+        import orjson
+
+        def _pretty(obj: Any) -> str:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    except ImportError:
+        import json
+
+        def _pretty(obj: Any) -> str:
+            return json.dumps(obj, ensure_ascii=False, indent=2)
 
     parser = argparse.ArgumentParser(description="FAQ DynamoDB CRUD CLI")
     subparsers = parser.add_subparsers(dest="cmd", required=True)
@@ -151,35 +366,40 @@ if __name__ == "__main__":
 
     p_get = subparsers.add_parser("get", help="Get an FAQ by question")
     p_get.add_argument("question", help="Question text (partition key)")
+    p_get.add_argument("--fields", nargs="+", help="Only fetch these attributes")
 
     p_update = subparsers.add_parser("update", help="Update an existing FAQ's answer")
     p_update.add_argument("question", help="Question text (partition key)")
     p_update.add_argument("answer", help="New answer text")
 
+    p_upsert = subparsers.add_parser("upsert", help="Create or update an FAQ")
+    p_upsert.add_argument("question", help="Question text (partition key)")
+    p_upsert.add_argument("answer", help="Answer text")
+
     p_delete = subparsers.add_parser("delete", help="Delete an FAQ by question")
     p_delete.add_argument("question", help="Question text (partition key)")
 
-    p_list = subparsers.add_parser("list", help="List FAQs (scan)")
+    p_list = subparsers.add_parser("list", help="List FAQs (newest first)")
     p_list.add_argument("--limit", type=int, default=20, help="Max items to return")
+    p_list.add_argument("--fields", nargs="+", help="Only fetch these attributes")
+
+    subparsers.add_parser("create-index", help=f"Create the {FAQ_TYPE_INDEX} GSI used by list")
+    subparsers.add_parser("backfill-type", help="Tag rows written before the GSI so list can see them")
 
     args = parser.parse_args()
 
-    if args.cmd == "create":
-        res = create_faq(args.question, args.answer)
-        print(_json.dumps(res, ensure_ascii=False, indent=2))
-    elif args.cmd == "get":
-        item = get_faq(args.question)
-        print(_json.dumps({"item": item}, ensure_ascii=False, indent=2))
-    elif args.cmd == "update":
-        res = update_faq(args.question, args.answer)
-        print(_json.dumps(res, ensure_ascii=False, indent=2))
-    elif args.cmd == "delete":
-        res = delete_faq(args.question)
-        print(_json.dumps(res, ensure_ascii=False, indent=2))
-    elif args.cmd == "list":
-        res = list_faqs(limit=args.limit)
-        print(_json.dumps(res, ensure_ascii=False, indent=2))
-    else:
+    dispatch = {
+        "create": lambda a: create_faq(a.question, a.answer),
+        "get": lambda a: {"item": get_faq(a.question, fields=a.fields)},
+        "update": lambda a: update_faq(a.question, a.answer),
+        "upsert": lambda a: upsert_faq(a.question, a.answer),
+        "delete": lambda a: delete_faq(a.question),
+        "list": lambda a: list_faqs(limit=a.limit, fields=a.fields),
+        "create-index": lambda a: create_type_index(),
+        "backfill-type": lambda a: backfill_type(),
+    }
+    command = dispatch.get(args.cmd)
+    if command is None:
         parser.print_help()
-
-
+    else:
+        print(_pretty(command(args)))
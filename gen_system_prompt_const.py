@@ -0,0 +1,30 @@
+"""system_prompt.txt を Python 定数に焼き込む（ビルド時に実行）
+
+    python gen_system_prompt_const.py
+
+生成される _system_prompt_const.py を test.py が import するので、
+起動時に system_prompt.txt を読む必要がなくなる。生成物は .gitignore 済み。
+生成時の system_prompt.txt の mtime/サイズも記録し、test.py は stat だけで
+食い違い（再生成忘れ）を検出してファイルを直接読む。
+"""
+import os
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(_HERE, "system_prompt.txt")
+DST = os.path.join(_HERE, "_system_prompt_const.py")
+
+
+def main() -> None:
+    with open(SRC, "r", encoding="utf-8") as f:
+        prompt = f.read()
+    st = os.stat(SRC)
+    with open(DST, "w", encoding="utf-8") as f:
+        f.write("# Generated by gen_system_prompt_const.py from system_prompt.txt; do not edit.\n")
+        # repr() は引用符やバックスラッシュを含んでも正しいリテラルになる
+        f.write(f"SYSTEM_PROMPT = {prompt!r}\n")
+        f.write(f"SOURCE_STAT = ({st.st_mtime_ns}, {st.st_size})\n")
+    print(f"wrote {DST} ({len(prompt)} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,46 @@
 import base64
 import json
 import os
+import re
+from collections import OrderedDict
 from datetime import datetime, timezone
-from urllib import request as _urlreq
+from functools import lru_cache
 from urllib import error as _urlerr
 from urllib.parse import urlencode as _urlencode
-import tempfile
-from typing import Optional
+from typing import Callable, Iterator, Optional, Tuple
 
 import boto3
+import urllib3
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import BotoCoreError, ClientError
 import auth
 
+try:  # optional: bundled via a layer when available
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+except ImportError:
+    def _dumps(obj) -> str:
+        # compact separators; default=str covers Decimal from the Table resource
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
 CALLS_TABLE_NAME = os.getenv("CALL_LOGS_TABLE_NAME", "ueki-chatbot")
+# Optional per-tenant phone index (PK=client_id, SK=phone_number). When unset,
+# /phones falls back to deduplicating the TsIndex query (migration path).
+PHONES_TABLE_NAME = os.getenv("PHONES_TABLE_NAME") or ""
+# Optional S3 bucket for recordings. When set, /recording/{sid} uploads the
+# Twilio audio once and redirects to a presigned URL instead of relaying
+# base64 through API Gateway (10MB payload limit).
+# Writes keep the index current from the first deploy; /phones only reads it
+# once backfill_phones.py has copied the existing numbers (set to "1" after that).
+PHONES_INDEX_READY = (os.getenv("PHONES_INDEX_READY") or "") == "1"
+RECORDINGS_BUCKET = os.getenv("RECORDINGS_BUCKET") or ""
+RECORDING_URL_TTL = int(os.getenv("RECORDING_URL_TTL") or 3600)
+# /tmp survives across warm invocations; keep recently fetched audio there
+RECORDING_CACHE_DIR = "/tmp"
+RECORDING_CACHE_MAX_BYTES = int(os.getenv("RECORDING_CACHE_MAX_BYTES") or 256 * 1024 * 1024)
+_STREAM_CHUNK = 64 * 1024
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID") or ""
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN") or ""
 OPENAI_SECRET_NAME = os.getenv("OPENAI_SECRET_NAME") or "UEKI_OPENAI_APIKEY"
@@ -21,40 +48,93 @@ OPENAI_API_KEY_ENV = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_APIKEY") o
 OPENAI_PROJECT_ENV = os.getenv("OPENAI_PROJECT") or os.getenv("OPENAI_PROJECT_ID")
 OPENAI_ORG_ENV = os.getenv("OPENAI_ORG") or os.getenv("OPENAI_ORGANIZATION")
 
-_ddb = boto3.resource("dynamodb")
-_table = _ddb.Table(CALLS_TABLE_NAME)
-_session = boto3.session.Session()
-_secrets = _session.client("secretsmanager", region_name=os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "ap-northeast-1")
+# DynamoDB / S3 handles are built on first use: the recording routes and
+# warmer pings never touch DynamoDB, so they skip the resource construction.
+_ddb = None
+_table = None
+_phones_table = None
+_ddb_client = None
+_s3 = None
+# S3 keys already uploaded by this container (skips head_object); oldest dropped past the cap
+S3_KNOWN_KEYS_MAX = 4096
+_S3_KNOWN_KEYS: "OrderedDict[str, None]" = OrderedDict()
+# Shared keep-alive pool for Twilio / OpenAI (urllib3 ships with botocore).
+# Every call sits on the API Gateway request path (30 s hard limit), so no
+# automatic retries: a caller's timeout is its whole budget. Redirects are
+# still followed (Twilio media URLs redirect to signed storage URLs).
+_NO_RETRY = urllib3.Retry(total=3, connect=0, read=0, status=0, other=0, redirect=3)
+_http = urllib3.PoolManager(num_pools=4, maxsize=10, retries=_NO_RETRY)
+_secrets = None  # created on first _get_openai_api_key() miss
 _OPENAI_API_KEY_CACHE: Optional[str] = None
 _OPENAI_PROJECT_ID_CACHE: Optional[str] = None
 _OPENAI_ORG_CACHE: Optional[str] = None
+_SK_RE = re.compile(r"sk-[A-Za-z0-9]{10,}")
+
+
+def _get_table():
+    global _ddb, _table
+    if _table is None:
+        if _ddb is None:
+            _ddb = boto3.resource("dynamodb")
+        _table = _ddb.Table(CALLS_TABLE_NAME)
+    return _table
+
+
+def _get_phones_table():
+    global _ddb, _phones_table
+    if _phones_table is None and PHONES_TABLE_NAME:
+        if _ddb is None:
+            _ddb = boto3.resource("dynamodb")
+        _phones_table = _ddb.Table(PHONES_TABLE_NAME)
+    return _phones_table
+
+
+def _get_ddb_client():
+    # Low-level client for the hot /calls listing: skips the resource layer's
+    # TypeSerializer/TypeDeserializer round-trip (see _from_av below)
+    global _ddb_client
+    if _ddb_client is None:
+        _ddb_client = boto3.client("dynamodb")
+    return _ddb_client
+
+
+def _get_s3():
+    global _s3
+    if _s3 is None and RECORDINGS_BUCKET:
+        _s3 = boto3.client("s3")
+    return _s3
 
 
 def _now_iso():
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 
+_CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+}
+# Shared by every JSON response; never mutate
+_JSON_RESP_HEADERS = {"content-type": "application/json; charset=utf-8", **_CORS_HEADERS}
+
+
 def _resp(status: int, body: dict):
     return {
         "statusCode": status,
-        "headers": {
-            "content-type": "application/json; charset=utf-8",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body, ensure_ascii=False),
+        "headers": _JSON_RESP_HEADERS,
+        "body": _dumps(body),
     }
 
 
+_OPTIONS_RESP = _resp(200, {"ok": True})
+
+
 def _bin_resp(status: int, content_type: str, data: bytes):
     return {
         "statusCode": status,
         "headers": {
             "content-type": content_type,
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+            **_CORS_HEADERS,
             # Suggest a browser filename for downloads (optional)
             # "Content-Disposition": "inline",
         },
@@ -63,101 +143,300 @@ def _bin_resp(status: int, content_type: str, data: bytes):
     }
 
 
+def _redirect_resp(location: str):
+    return {
+        "statusCode": 302,
+        "headers": {"Location": location, **_CORS_HEADERS},
+        "body": "",
+    }
+
+
+def _from_av(av: dict):
+    """Convert a DynamoDB AttributeValue into a plain JSON-able value."""
+    if "S" in av:
+        return av["S"]
+    if "N" in av:
+        n = av["N"]
+        return int(n) if n.lstrip("-").isdigit() else float(n)
+    if "BOOL" in av:
+        return av["BOOL"]
+    if "NULL" in av:
+        return None
+    if "M" in av:
+        return {k: _from_av(v) for k, v in av["M"].items()}
+    if "L" in av:
+        return [_from_av(v) for v in av["L"]]
+    if "SS" in av:
+        return list(av["SS"])
+    if "NS" in av:
+        return [_from_av({"N": n}) for n in av["NS"]]
+    if "B" in av:
+        return base64.b64encode(av["B"]).decode("ascii")
+    return None
+
+
+def _from_item(item: dict) -> dict:
+    return {k: _from_av(v) for k, v in item.items()}
+
+
+# ASCII chars other than 0-9 and '+' -> deleted by str.translate (runs in C)
+_DIGITS_DEL_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if chr(c) not in "0123456789+"))
+
+
 def _digits_only(s: str) -> str:
+    if s.isascii():
+        return s.translate(_DIGITS_DEL_TABLE)
+    # non-ASCII input (e.g. full-width digits): keep str.isdigit semantics, as the
+    # chat Lambda's _digits_only does, so both write/read the same phone keys
     return "".join(ch for ch in s if ch.isdigit() or ch == '+')
 
 
 def _normalize_phone_number(raw: str | None) -> str | None:
     if not raw:
         return raw
-    s = _digits_only(str(raw))
+    # body values may be non-str (and unhashable); only the str form is cached
+    return _normalize_phone_str(str(raw))
+
+
+@lru_cache(maxsize=4096)
+def _normalize_phone_str(raw: str) -> str:
+    s = _digits_only(raw)
+    if s[:1] != '+':
+        return s
     if s.startswith('+81') and len(s) >= 4:
         rest = s[3:]
-        if not rest.startswith('0'):
-            return '0' + rest
-        return rest
-    if s.startswith('+'):
-        return s[1:]
-    return s
+        return rest if rest[0] == '0' else '0' + rest
+    return s[1:]
 
 
 def _parse_query(event):
     return event.get("queryStringParameters") or {}
 
 
+@lru_cache(maxsize=1)
 def _twilio_auth_header() -> str:
+    # credentials come from env and are fixed for the container's lifetime
     token = f"{TWILIO_ACCOUNT_SID}:{TWILIO_AUTH_TOKEN}".encode("utf-8")
     return "Basic " + base64.b64encode(token).decode("ascii")
 
 
 def _http_get_bytes(url: str, headers: dict[str, str] | None = None, timeout_secs: int = 15) -> bytes:
-    req = _urlreq.Request(url, method="GET")
-    for k, v in (headers or {}).items():
-        req.add_header(k, v)
-    with _urlreq.urlopen(req, timeout=timeout_secs) as resp:
-        return resp.read()
+    r = _http.request("GET", url, headers=headers or {}, timeout=urllib3.Timeout(total=timeout_secs), retries=_NO_RETRY)
+    if r.status >= 400:
+        # keep urlopen's failure semantics for callers
+        raise _urlerr.HTTPError(url, r.status, r.reason, r.headers, None)
+    return r.data
+
+
+def _evict_recording_cache() -> None:
+    entries = []
+    total = 0
+    for name in os.listdir(RECORDING_CACHE_DIR):
+        if not name.startswith("rec_"):
+            continue
+        try:
+            st = os.stat(os.path.join(RECORDING_CACHE_DIR, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+        total += st.st_size
+    # oldest first until under the cap
+    for _, size, name in sorted(entries):
+        if total <= RECORDING_CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(os.path.join(RECORDING_CACHE_DIR, name))
+            total -= size
+        except OSError:
+            pass
+
+
+def _recording_url(sid: str, fmt: str) -> str:
+    return f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Recordings/{sid}.{fmt}"
+
+
+def _recording_cache_path(sid: str, fmt: str) -> Optional[str]:
+    # never build a cache path from an unexpected sid
+    if not sid.isalnum():
+        return None
+    return os.path.join(RECORDING_CACHE_DIR, f"rec_{sid}.{fmt}")
+
+
+def _read_cached_recording(sid: str, fmt: str) -> Optional[bytes]:
+    path = _recording_cache_path(sid, fmt)
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _get_recording_bytes(sid: str, fmt: str, timeout_secs: int = 15) -> bytes:
+    """Twilio recording audio, served from /tmp when this sandbox has fetched it before."""
+    data = _read_cached_recording(sid, fmt)
+    if data is not None:
+        return data
+    data = _http_get_bytes(_recording_url(sid, fmt), headers={"Authorization": _twilio_auth_header()}, timeout_secs=timeout_secs)
+    path = _recording_cache_path(sid, fmt)
+    if path:
+        try:
+            tmp_path = f"{path}.{os.getpid()}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            _evict_recording_cache()
+        except OSError as e:
+            print(f"[ueki-calllogs] recording cache write failed: {e}", flush=True)
+    return data
+
+
+def _stream_recording(sid: str, fmt: str, timeout_secs: int = 15) -> Tuple[Iterator[bytes], Callable[[], None]]:
+    """Open the Twilio download and return an iterator over its body plus a release callback.
+
+    The request is issued (and its status checked) before returning, so
+    Twilio errors surface before any upload starts. Chunks are teed into
+    the /tmp cache as they pass through. Call the release callback once the
+    iterator is abandoned: closing a generator that never started skips its
+    finally, so the connection would otherwise stay checked out.
+    """
+    url = _recording_url(sid, fmt)
+    r = _http.request(
+        "GET", url,
+        headers={"Authorization": _twilio_auth_header()},
+        timeout=urllib3.Timeout(total=timeout_secs),
+        retries=_NO_RETRY,
+        preload_content=False,
+    )
+    if r.status >= 400:
+        r.release_conn()
+        raise _urlerr.HTTPError(url, r.status, r.reason, r.headers, None)
+
+    def _chunks() -> Iterator[bytes]:
+        path = _recording_cache_path(sid, fmt)
+        tmp_path = f"{path}.{os.getpid()}.part" if path else None
+        f = None
+        if tmp_path:
+            try:
+                f = open(tmp_path, "wb")
+            except OSError:
+                f = None
+        try:
+            for chunk in r.stream(_STREAM_CHUNK):
+                if f:
+                    f.write(chunk)
+                yield chunk
+            if f:
+                f.close()
+                f = None
+                os.replace(tmp_path, path)
+                _evict_recording_cache()
+        finally:
+            if f:
+                f.close()
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            r.release_conn()
+
+    return _chunks(), r.release_conn
 
 
 def _http_get_json(url: str, headers: dict[str, str] | None = None) -> dict:
     raw = _http_get_bytes(url, headers=headers)
     try:
-        return json.loads(raw.decode("utf-8"))
+        # json.loads detects UTF-8 bytes itself; skip the intermediate str copy
+        return json.loads(raw)
     except Exception:
         return {}
 
 
+def _query_by_call_sid(call_sid: str, client_id: str) -> list:
+    """All log items for a call via CallSidIndex, filtered to the tenant.
+
+    A call is a handful of turns, so this is normally a single page; the
+    1MB response cap bounds page size rather than an item count.
+    """
+    items_acc = []
+    last_key = None
+    while True:
+        kwargs = {
+            "IndexName": "CallSidIndex",
+            "KeyConditionExpression": Key("call_sid").eq(call_sid),
+            "Limit": 1000,
+        }
+        if last_key:
+            kwargs["ExclusiveStartKey"] = last_key
+        r = _get_table().query(**kwargs)
+        items_acc.extend(r.get("Items", []))
+        last_key = r.get("LastEvaluatedKey")
+        if not last_key:
+            break
+    # Tenant filtering (safety)
+    return [it for it in items_acc if it.get("client_id") == client_id]
+
+
+def _parse_openai_secret_json(secret: str) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """(key, project, org) from a JSON secret; all None if it isn't valid JSON."""
+    key: Optional[str] = None
+    project: Optional[str] = None
+    org: Optional[str] = None
+    try:
+        obj = json.loads(secret)
+    except Exception:
+        # Not valid JSON; fallthrough
+        return None, None, None
+    # Broad key search (align with chat handler)
+    for k in ("OPENAI_API_KEY", "api_key", "key", "OPENAI_APIKEY", "openai_api_key", "OPENAI-API-KEY", "API_KEY", "token"):
+        if obj.get(k):
+            key = str(obj[k]).strip()
+            break
+    for k in ("OPENAI_PROJECT", "project", "project_id"):
+        if obj.get(k):
+            project = str(obj[k]).strip()
+            break
+    for k in ("OPENAI_ORG", "OPENAI_ORGANIZATION", "organization", "org"):
+        if obj.get(k):
+            org = str(obj[k]).strip()
+            break
+    # Final fallback: any plausible-looking string value
+    if not key:
+        for v in obj.values():
+            if isinstance(v, str) and (v.startswith("sk-") or len(v) > 20):
+                key = v.strip()
+                break
+    return key, project, org
+
+
 def _get_openai_api_key() -> Optional[str]:
-    global _OPENAI_API_KEY_CACHE, _OPENAI_PROJECT_ID_CACHE, _OPENAI_ORG_CACHE
+    global _OPENAI_API_KEY_CACHE, _OPENAI_PROJECT_ID_CACHE, _OPENAI_ORG_CACHE, _secrets
     if _OPENAI_API_KEY_CACHE:
         return _OPENAI_API_KEY_CACHE
     # 1) Prefer Secrets Manager
     try:
+        if _secrets is None:
+            _secrets = boto3.client("secretsmanager", region_name=os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "ap-northeast-1")
         r = _secrets.get_secret_value(SecretId=OPENAI_SECRET_NAME)
         secret = (r.get("SecretString") or "").strip()
         if secret:
+            # Common case: the secret is the bare key
+            if secret.startswith("sk-"):
+                _OPENAI_API_KEY_CACHE = secret
+                return secret
             key: Optional[str] = None
             project: Optional[str] = None
             org: Optional[str] = None
             if secret.startswith("{") and secret.endswith("}"):
-                try:
-                    obj = json.loads(secret)
-                    # Broad key search (align with chat handler)
-                    for k in ("OPENAI_API_KEY", "api_key", "key", "OPENAI_APIKEY", "openai_api_key", "OPENAI-API-KEY", "API_KEY", "token"):
-                        if obj.get(k):
-                            key = str(obj[k]).strip()
-                            break
-                    for k in ("OPENAI_PROJECT", "project", "project_id"):
-                        if obj.get(k):
-                            project = str(obj[k]).strip()
-                            break
-                    for k in ("OPENAI_ORG", "OPENAI_ORGANIZATION", "organization", "org"):
-                        if obj.get(k):
-                            org = str(obj[k]).strip()
-                            break
-                    # Final fallback: any plausible-looking string value
-                    if not key:
-                        for v in obj.values():
-                            if isinstance(v, str) and (v.startswith("sk-") or len(v) > 20):
-                                key = v.strip()
-                                break
-                except Exception:
-                    # Not valid JSON; fallthrough
-                    key = None
+                key, project, org = _parse_openai_secret_json(secret)
             if not key:
-                # Plain string, or embedded JSON-like string containing sk-
-                if secret.startswith("sk-"):
-                    key = secret
-                else:
-                    # Try naive extraction of sk- token
-                    try:
-                        import re
-                        m = re.search(r"(sk-[A-Za-z0-9]{10,})", secret)
-                        if m:
-                            key = m.group(1).strip()
-                    except Exception:
-                        pass
+                # Embedded JSON-like string containing sk-: naive extraction
+                m = _SK_RE.search(secret)
+                if m:
+                    key = m.group(0)
                 # If still none, treat full secret as key as last resort
-                if not key and secret and "{" not in secret:
+                if not key and "{" not in secret:
                     key = secret
             # Set caches if resolved
             if key:
@@ -190,384 +469,477 @@ def _get_openai_project_id() -> Optional[str]:
     return None
 
 
-def handler(event, context):
+# ======= Twilio Recordings: List by call_sid =======
+# GET /recordings?call_sid=CAxxxx
+def _get_recordings(event, client_id: str, path: str):
+    q = _parse_query(event)
+    call_sid = (q.get("call_sid") or q.get("callSid") or "").strip()
+    if not call_sid:
+        return _resp(400, {"ok": False, "error": "call_sid is required"})
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
+        return _resp(500, {"ok": False, "error": "Twilio credentials are not configured"})
+    url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Calls/{call_sid}/Recordings.json"
+    data = _http_get_json(url, headers={"Authorization": _twilio_auth_header()})
+    recs = data.get("recordings") or data.get("recordings", []) or data.get("items") or []
+    # Normalize fields we care about
+    items = []
+    for r in recs:
+        items.append({
+            "sid": r.get("sid"),
+            "duration": r.get("duration"),
+            "date_created": r.get("date_created") or r.get("dateCreated"),
+            "media_format": "mp3",
+        })
+    return _resp(200, {"ok": True, "items": items})
+
+
+# ======= Twilio Recording: Stream audio =======
+# GET /recording/{sid}            (defaults to mp3)
+# GET /recording/{sid}.mp3
+def _get_recording(event, client_id: str, path: str):
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
+        return _resp(500, {"ok": False, "error": "Twilio credentials are not configured"})
+    # Extract recording SID from path
+    # Accept both /recording/RE123 and /recording/RE123.mp3
+    parts = path.split("/")
+    sid_part = parts[-1] if parts else ""
+    if not sid_part:
+        return _resp(400, {"ok": False, "error": "recording sid missing"})
+    sid = sid_part.split(".")[0]
+    # format optional (default mp3)
+    q = _parse_query(event)
+    fmt = (q.get("format") or "mp3").lower()
+    if fmt not in ("mp3", "wav"):
+        fmt = "mp3"
+    ct = "audio/mpeg" if fmt == "mp3" else "audio/wav"
+    s3 = _get_s3()
+    if s3 is not None:
+        key = f"recordings/{client_id}/{sid}.{fmt}"
+        if key not in _S3_KNOWN_KEYS:
+            try:
+                s3.head_object(Bucket=RECORDINGS_BUCKET, Key=key)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                    raise
+                data = _get_recording_bytes(sid, fmt)
+                s3.put_object(Bucket=RECORDINGS_BUCKET, Key=key, Body=data, ContentType=ct)
+            _S3_KNOWN_KEYS[key] = None
+            if len(_S3_KNOWN_KEYS) > S3_KNOWN_KEYS_MAX:
+                _S3_KNOWN_KEYS.popitem(last=False)
+        else:
+            _S3_KNOWN_KEYS.move_to_end(key)
+        presigned = s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": RECORDINGS_BUCKET, "Key": key},
+            ExpiresIn=RECORDING_URL_TTL,
+        )
+        return _redirect_resp(presigned)
+    data = _get_recording_bytes(sid, fmt)
+    return _bin_resp(200, ct, data)
+
+
+# ======= Transcription via OpenAI Whisper =======
+# GET /transcription?recording_sid=RE...&format=mp3
+def _get_transcription(event, client_id: str, path: str):
+    q = _parse_query(event)
+    rec_sid = (q.get("recording_sid") or q.get("sid") or "").strip()
+    fmt = (q.get("format") or "mp3").lower()
+    if not rec_sid:
+        return _resp(400, {"ok": False, "error": "recording_sid is required"})
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
+        return _resp(500, {"ok": False, "error": "Twilio credentials are not configured"})
+    api_key = _get_openai_api_key()
+    if not api_key:
+        return _resp(500, {"ok": False, "error": "OpenAI API key is not configured (Secrets Manager)"})
+    if fmt not in ("mp3", "wav"):
+        fmt = "mp3"
+    # call OpenAI Whisper via REST (no SDK dependency)
+    boundary = f"----uekiBoundary{int(datetime.now().timestamp()*1000)}"
+    def _part_headers(name: str, extra: str = "") -> bytes:
+        return (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"{extra}\r\n\r\n').encode("utf-8")
+    content_type = "audio/mpeg" if fmt == "mp3" else "audio/wav"
+    preamble = b"".join((
+        # model
+        _part_headers("model"), b"whisper-1\r\n",
+        # response_format
+        _part_headers("response_format"), b"verbose_json\r\n",
+        # temperature
+        _part_headers("temperature"), b"0\r\n",
+        # file
+        _part_headers("file", f'; filename="audio.{fmt}"'),
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8"),
+    ))
+    # file part terminator + end boundary
+    trailer = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    audio_bytes = _read_cached_recording(rec_sid, fmt)
+    release_audio: Optional[Callable[[], None]] = None
+    if audio_bytes is not None:
+        # b"".join sizes the buffer once and copies each piece once
+        body = b"".join((preamble, audio_bytes, trailer))
+        del audio_bytes  # only the multipart copy needs to stay resident during upload
+    else:
+        # cache miss: pipe the Twilio download straight into a chunked upload,
+        # with a conservative timeout to keep total under 30s
+        audio_chunks, release_audio = _stream_recording(rec_sid, fmt, timeout_secs=10)
+
+        def _multipart() -> Iterator[bytes]:
+            yield preamble
+            yield from audio_chunks
+            yield trailer
+
+        body = _multipart()
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+    }
+    project_id = _get_openai_project_id()
+    if project_id:
+        headers["OpenAI-Project"] = project_id
+    if _OPENAI_ORG_CACHE:
+        headers["OpenAI-Organization"] = _OPENAI_ORG_CACHE
     try:
-        client_id = auth.get_client_id(event)
+        try:
+            r = _http.request(
+                "POST",
+                "https://api.openai.com/v1/audio/transcriptions",
+                body=body,
+                headers=headers,
+                chunked=not isinstance(body, bytes),
+                timeout=25,
+                retries=False,  # a retried upload would not fit the 30s budget
+                preload_content=False,
+            )
+        except urllib3.exceptions.HTTPError as ue:
+            return _resp(502, {"ok": False, "error": f"OpenAI URL error: {ue}"})
+    finally:
+        # Upload sent or abandoned: close the body so a half-read Twilio stream
+        # drops its partial cache file, then release the download connection
+        # (a no-op if the stream already ran to completion).
+        if release_audio is not None:
+            body.close()
+            release_audio()
+    try:
+        if r.status >= 400:
+            err_body = r.read().decode("utf-8", errors="ignore")
+            return _resp(502, {"ok": False, "error": f"OpenAI HTTP {r.status}: {err_body[:500]}"})
+        try:
+            # parse straight off the response (json handles UTF-8 bytes itself)
+            result = json.load(r)
+        except Exception:
+            return _resp(502, {"ok": False, "error": "Invalid response from OpenAI"})
+    finally:
+        r.release_conn()
+    # If OpenAI returned an error object, surface it
+    if isinstance(result, dict) and "error" in result:
+        err = result.get("error") or {}
+        msg = err.get("message") or "OpenAI error"
+        code = err.get("code") or ""
+        return _resp(502, {"ok": False, "error": f"{msg} ({code})"})
+    text = result.get("text") or ""
+    segments = result.get("segments") or None
+    return _resp(200, {"ok": True, "text": text, "segments": segments})
+
+
+# List calls by phone with optional range/paging
+def _list_calls(event, client_id: str, path: str):
+    q = _parse_query(event)
+    phone = _normalize_phone_number(q.get("phone"))
+    # If phone is not provided, we list recent calls for the client
+    # using TsIndex (GSI: PK=client_id, SK=ts)
+    
+    ts_from = q.get("from")
+    ts_to = q.get("to")
+    limit = int(q.get("limit") or 50)
+    order = (q.get("order") or "asc").lower()  # 'asc' | 'desc'
+    next_token = None
+    if "next_token" in q and q["next_token"]:
+        try:
+            next_token = json.loads(q["next_token"])
+        except Exception:
+            next_token = None
+
+    values = {":c": {"S": client_id}}
+    if phone:
+        # Query by client_id & sk prefix
+        kwargs = {
+            "TableName": CALLS_TABLE_NAME,
+            "KeyConditionExpression": "client_id = :c AND begins_with(sk, :p)",
+            "ScanIndexForward": False if order == "desc" else True,
+            "Limit": limit,
+        }
+        # Time range filtering for specific phone is tricky with composite key prefix.
+        # If ts_from/to is provided, we can't easily use begins_with prefix AND range on sk.
+        # But since sk = phone#ts, we can construct range keys:
+        # start_sk = phone#ts_from, end_sk = phone#ts_to
+        if ts_from or ts_to:
+            s_min = ts_from or "0000"
+            s_max = ts_to or "9999"
+            # Overwrite condition
+            kwargs["KeyConditionExpression"] = "client_id = :c AND sk BETWEEN :a AND :b"
+            values[":a"] = {"S": f"{phone}#{s_min}"}
+            values[":b"] = {"S": f"{phone}#{s_max}"}
+        else:
+            values[":p"] = {"S": phone + "#"}
+    else:
+        # Query all calls for client using GSI
+        kwargs = {
+            "TableName": CALLS_TABLE_NAME,
+            "IndexName": "TsIndex",
+            "KeyConditionExpression": "client_id = :c",
+            "ScanIndexForward": False if order == "desc" else True,
+            "Limit": limit,
+        }
+        if ts_from and ts_to:
+            kwargs["KeyConditionExpression"] = "client_id = :c AND #ts BETWEEN :a AND :b"
+            values[":a"] = {"S": ts_from}
+            values[":b"] = {"S": ts_to}
+        elif ts_from:
+            kwargs["KeyConditionExpression"] = "client_id = :c AND #ts >= :a"
+            values[":a"] = {"S": ts_from}
+        elif ts_to:
+            kwargs["KeyConditionExpression"] = "client_id = :c AND #ts <= :b"
+            values[":b"] = {"S": ts_to}
+        if ts_from or ts_to:
+            kwargs["ExpressionAttributeNames"] = {"#ts": "ts"}
+    kwargs["ExpressionAttributeValues"] = values
+
+    if next_token:
+        # next_token is handed out in plain form; all key attributes are strings
+        kwargs["ExclusiveStartKey"] = {k: {"S": str(v)} for k, v in next_token.items()}
+
+    r = _get_ddb_client().query(**kwargs)
+    lek = r.get("LastEvaluatedKey")
+    return _resp(200, {
+        "ok": True,
+        "items": [_from_item(it) for it in r.get("Items", [])],
+        "next_token": _from_item(lek) if lek else None,
+    })
+
+
+# List distinct phones
+def _list_phones(event, client_id: str, path: str):
+    phones_table = _get_phones_table() if PHONES_INDEX_READY else None
+    if phones_table is not None:
+        # phone_number is the sort key and is normalized on write
+        r = phones_table.query(
+            KeyConditionExpression=Key("client_id").eq(client_id),
+            ProjectionExpression="phone_number",
+            Limit=1000,
+        )
+        items = [it["phone_number"] for it in r.get("Items", [])]
+        if items:
+            return _resp(200, {"ok": True, "items": items})
+        # empty index (e.g. tenant not backfilled yet): fall through to the dedupe
+    try:
+        phones = set()
+        last_key = None
+        # Use Query instead of Scan (efficient tenant isolation)
+        # Query TsIndex (all items for this client)
+        while True:
+            kwargs = {
+                "IndexName": "TsIndex",
+                "KeyConditionExpression": Key("client_id").eq(client_id),
+                "Limit": 500,
+                "ProjectionExpression": "phone_number" # optimize fetch
+            }
+            if last_key:
+                kwargs["ExclusiveStartKey"] = last_key
+            r = _get_table().query(**kwargs)
+            for it in r.get("Items", []):
+                pn = it.get("phone_number")
+                if pn:
+                    norm = _normalize_phone_number(pn)
+                    if norm:
+                        phones.add(norm)
+            last_key = r.get("LastEvaluatedKey")
+            if not last_key or len(phones) >= 1000:
+                break
+        return _resp(200, {"ok": True, "items": sorted(list(phones))})
+    except Exception as e:
+        print(f"[ueki-calllogs] /phones error: {e}", flush=True)
+        return _resp(500, {"ok": False, "error": str(e)})
+
+
+# Create call log
+def _create_call(event, client_id: str, path: str):
+    body = json.loads(event.get("body") or "{}")
+    phone = _normalize_phone_number(body.get("phone_number"))
+    if not phone:
+        return _resp(400, {"ok": False, "error": "phone_number required"})
+    ts = body.get("ts") or _now_iso()
+    user_text = body.get("user_text") or ""
+    assistant_text = body.get("assistant_text") or ""
+    call_sid = body.get("call_sid") or body.get("callSid") or ""
+    
+    sk = f"{phone}#{ts}"
+    item = {
+        "client_id": client_id,
+        "sk": sk,
+        "phone_number": phone,
+        "ts": ts,
+        "user_text": user_text,
+        "assistant_text": assistant_text,
+        **({"call_sid": call_sid} if call_sid else {}),
+    }
+    _get_table().put_item(Item=item)
+    phones_table = _get_phones_table()
+    if phones_table is not None:
+        # idempotent: keeps /phones a single Query instead of a dedupe over all logs
+        phones_table.put_item(Item={"client_id": client_id, "phone_number": phone})
+    return _resp(200, {"ok": True, "item": item})
+
+
+# Get call log(s)
+def _get_call(event, client_id: str, path: str):
+    q = _parse_query(event)
+    phone = _normalize_phone_number(q.get("phone"))
+    ts = q.get("ts")
+    call_sid = q.get("call_sid") or q.get("callSid")
+    
+    if call_sid and not (phone and ts):
+        # Lookup by GSI CallSidIndex
+        items_acc = _query_by_call_sid(call_sid, client_id)
+        
+        if not items_acc:
+            return _resp(404, {"ok": False, "error": "not found"})
+        return _resp(200, {"ok": True, "items": items_acc})
+        
+    if not phone or not ts:
+        return _resp(400, {"ok": False, "error": "phone and ts required (or provide call_sid)"})
+    
+    sk = f"{phone}#{ts}"
+    r = _get_table().get_item(Key={"client_id": client_id, "sk": sk})
+    it = r.get("Item")
+    if not it:
+        return _resp(404, {"ok": False, "error": "not found"})
+    return _resp(200, {"ok": True, "item": it})
+
+
+# Update call log
+def _update_call(event, client_id: str, path: str):
+    body = json.loads(event.get("body") or "{}")
+    phone = _normalize_phone_number(body.get("phone_number"))
+    ts = body.get("ts")
+    if not phone or not ts:
+        return _resp(400, {"ok": False, "error": "phone_number and ts required"})
+    
+    sk = f"{phone}#{ts}"
+    expr = []
+    values = {}
+    if "user_text" in body:
+        expr.append("user_text = :u")
+        values[":u"] = body.get("user_text")
+    if "assistant_text" in body:
+        expr.append("assistant_text = :a")
+        values[":a"] = body.get("assistant_text")
+    if "call_sid" in body or "callSid" in body:
+        expr.append("call_sid = :c")
+        values[":c"] = body.get("call_sid") or body.get("callSid")
+    if not expr:
+        return _resp(400, {"ok": False, "error": "nothing to update"})
+    r = _get_table().update_item(
+        Key={"client_id": client_id, "sk": sk},
+        UpdateExpression="SET " + ", ".join(expr),
+        ExpressionAttributeValues=values,
+        ConditionExpression="attribute_exists(client_id) AND attribute_exists(sk)",
+        ReturnValues="ALL_NEW",
+    )
+    return _resp(200, {"ok": True, "item": r.get("Attributes")})
+
+
+def _prune_phones(client_id: str, phones) -> None:
+    """Drop phone index entries whose last call log was just deleted."""
+    phones_table = _get_phones_table()
+    if phones_table is None:
+        return
+    for phone in phones:
+        r = _get_table().query(
+            KeyConditionExpression=Key("client_id").eq(client_id) & Key("sk").begins_with(phone + "#"),
+            ProjectionExpression="sk",
+            Limit=1,
+        )
+        if not r.get("Items"):
+            phones_table.delete_item(Key={"client_id": client_id, "phone_number": phone})
+
+
+# Delete call log(s)
+def _delete_call(event, client_id: str, path: str):
+    q = _parse_query(event)
+    phone = _normalize_phone_number(q.get("phone"))
+    ts = q.get("ts")
+    call_sid = q.get("call_sid") or q.get("callSid")
+    
+    if call_sid and not (phone and ts):
+        # delete all items by call_sid via GSI query + batch delete
+        items_acc = _query_by_call_sid(call_sid, client_id)
         
+        # BatchWriteItem (25 per request); deletes are idempotent so no condition needed
+        with _get_table().batch_writer() as bw:
+            for it in items_acc:
+                pk = it.get("client_id")
+                sk = it.get("sk")
+                if pk and sk:
+                    bw.delete_item(Key={"client_id": pk, "sk": sk})
+        _prune_phones(client_id, {it["sk"].partition("#")[0] for it in items_acc if it.get("sk")})
+        return _resp(200, {"ok": True, "deleted": len(items_acc)})
+        
+    if not phone or not ts:
+        return _resp(400, {"ok": False, "error": "phone and ts required (or provide call_sid)"})
+    
+    sk = f"{phone}#{ts}"
+    _get_table().delete_item(
+        Key={"client_id": client_id, "sk": sk},
+        ConditionExpression="attribute_exists(client_id) AND attribute_exists(sk)",
+    )
+    _prune_phones(client_id, (phone,))
+    return _resp(200, {"ok": True})
+
+
+# Exact (method, path) routes, then prefix routes tried in order on a miss
+_ROUTES = {
+    ("GET", "/recordings"): _get_recordings,
+    ("GET", "/transcription"): _get_transcription,
+    ("POST", "/call"): _create_call,
+    ("GET", "/call"): _get_call,
+    ("PUT", "/call"): _update_call,
+}
+_PREFIX_ROUTES = (
+    ("GET", "/recording", _get_recording),
+    ("GET", "/calls", _list_calls),
+    ("GET", "/phones", _list_phones),
+    ("DELETE", "/call", _delete_call),
+)
+
+
+def handler(event, context):
+    # Scheduled warmer ping (EventBridge): keep the sandbox and its caches warm.
+    # The only work is priming the OpenAI key (one Secrets Manager call, then a
+    # cache hit), so the first /transcription on a warmed sandbox skips it while
+    # imports stay free of boto3 clients.
+    if event.get("warmer") or event.get("source") == "aws.events":
+        try:
+            _get_openai_api_key()
+        except Exception:
+            pass
+        return {"statusCode": 200, "body": "warm"}
+    try:
         http = event.get("requestContext", {}).get("http", {})
         method = http.get("method", "GET").upper()
-        path = http.get("path", "/")
-
+        # CORS preflight: answer before auth or any other work
         if method == "OPTIONS":
-            return _resp(200, {"ok": True})
-
-        # ======= Twilio Recordings: List by call_sid =======
-        # GET /recordings?call_sid=CAxxxx
-        if method == "GET" and path == "/recordings":
-            q = _parse_query(event)
-            call_sid = (q.get("call_sid") or q.get("callSid") or "").strip()
-            if not call_sid:
-                return _resp(400, {"ok": False, "error": "call_sid is required"})
-            if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
-                return _resp(500, {"ok": False, "error": "Twilio credentials are not configured"})
-            url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Calls/{call_sid}/Recordings.json"
-            data = _http_get_json(url, headers={"Authorization": _twilio_auth_header()})
-            recs = data.get("recordings") or data.get("recordings", []) or data.get("items") or []
-            # Normalize fields we care about
-            items = []
-            for r in recs:
-                items.append({
-                    "sid": r.get("sid"),
-                    "duration": r.get("duration"),
-                    "date_created": r.get("date_created") or r.get("dateCreated"),
-                    "media_format": "mp3",
-                })
-            return _resp(200, {"ok": True, "items": items})
+            return _OPTIONS_RESP
 
-        # ======= Twilio Recording: Stream audio =======
-        # GET /recording/{sid}            (defaults to mp3)
-        # GET /recording/{sid}.mp3
-        if method == "GET" and path.startswith("/recording"):
-            if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
-                return _resp(500, {"ok": False, "error": "Twilio credentials are not configured"})
-            # Extract recording SID from path
-            # Accept both /recording/RE123 and /recording/RE123.mp3
-            parts = path.split("/")
-            sid_part = parts[-1] if parts else ""
-            if not sid_part:
-                return _resp(400, {"ok": False, "error": "recording sid missing"})
-            sid = sid_part.split(".")[0]
-            # format optional (default mp3)
-            q = _parse_query(event)
-            fmt = (q.get("format") or "mp3").lower()
-            if fmt not in ("mp3", "wav"):
-                fmt = "mp3"
-            url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Recordings/{sid}.{fmt}"
-            data = _http_get_bytes(url, headers={"Authorization": _twilio_auth_header()})
-            ct = "audio/mpeg" if fmt == "mp3" else "audio/wav"
-            return _bin_resp(200, ct, data)
-
-        # ======= Transcription via OpenAI Whisper =======
-        # GET /transcription?recording_sid=RE...&format=mp3
-        if method == "GET" and path == "/transcription":
-            q = _parse_query(event)
-            rec_sid = (q.get("recording_sid") or q.get("sid") or "").strip()
-            fmt = (q.get("format") or "mp3").lower()
-            if not rec_sid:
-                return _resp(400, {"ok": False, "error": "recording_sid is required"})
-            if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
-                return _resp(500, {"ok": False, "error": "Twilio credentials are not configured"})
-            api_key = _get_openai_api_key()
-            if not api_key:
-                return _resp(500, {"ok": False, "error": "OpenAI API key is not configured (Secrets Manager)"})
-            if fmt not in ("mp3", "wav"):
-                fmt = "mp3"
-            # fetch audio bytes from Twilio
-            url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Recordings/{rec_sid}.{fmt}"
-            # fetch Twilio audio with a conservative timeout to keep total under 30s
-            audio_bytes = _http_get_bytes(url, headers={"Authorization": _twilio_auth_header()}, timeout_secs=10)
-            # write to temp file with extension
-            with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as tf:
-                tf.write(audio_bytes)
-                temp_path = tf.name
-            # call OpenAI Whisper via REST (no SDK dependency)
-            try:
-                boundary = f"----uekiBoundary{int(datetime.now().timestamp()*1000)}"
-                def _part_headers(name: str, extra: str = "") -> bytes:
-                    return (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"{extra}\r\n\r\n').encode("utf-8")
-                body = bytearray()
-                # model
-                body += _part_headers("model")
-                body += b"whisper-1\r\n"
-                # response_format
-                body += _part_headers("response_format")
-                body += b"verbose_json\r\n"
-                # temperature
-                body += _part_headers("temperature")
-                body += b"0\r\n"
-                # file
-                content_type = "audio/mpeg" if fmt == "mp3" else "audio/wav"
-                body += _part_headers("file", f'; filename="audio.{fmt}"')
-                body += (f"Content-Type: {content_type}\r\n\r\n").encode("utf-8")
-                body += audio_bytes
-                body += b"\r\n"
-                # end boundary
-                body += (f"--{boundary}--\r\n").encode("utf-8")
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": f"multipart/form-data; boundary={boundary}",
-                }
-                project_id = _get_openai_project_id()
-                if project_id:
-                    headers["OpenAI-Project"] = project_id
-                if _OPENAI_ORG_CACHE:
-                    headers["OpenAI-Organization"] = _OPENAI_ORG_CACHE
-                req = _urlreq.Request(
-                    "https://api.openai.com/v1/audio/transcriptions",
-                    method="POST",
-                    data=bytes(body),
-                    headers=headers,
-                )
-                try:
-                    with _urlreq.urlopen(req, timeout=25) as resp:
-                        raw = resp.read()
-                except _urlerr.HTTPError as he:
-                    try:
-                        err_body = he.read().decode("utf-8", errors="ignore")
-                    except Exception:
-                        err_body = ""
-                    return _resp(502, {"ok": False, "error": f"OpenAI HTTP {he.code}: {err_body[:500]}"})
-                except _urlerr.URLError as ue:
-                    return _resp(502, {"ok": False, "error": f"OpenAI URL error: {ue.reason}"})
-                try:
-                    result = json.loads(raw.decode("utf-8"))
-                except Exception:
-                    return _resp(502, {"ok": False, "error": "Invalid response from OpenAI"})
-                # If OpenAI returned an error object, surface it
-                if isinstance(result, dict) and "error" in result:
-                    err = result.get("error") or {}
-                    msg = err.get("message") or "OpenAI error"
-                    code = err.get("code") or ""
-                    return _resp(502, {"ok": False, "error": f"{msg} ({code})"})
-                text = result.get("text") or ""
-                segments = result.get("segments") or None
-                return _resp(200, {"ok": True, "text": text, "segments": segments})
-            finally:
-                try:
-                    os.unlink(temp_path)
-                except Exception:
-                    pass
+        client_id = auth.get_client_id(event)
+        path = http.get("path", "/")
 
-        # List calls by phone with optional range/paging
-        if method == "GET" and path.startswith("/calls"):
-            q = _parse_query(event)
-            phone = _normalize_phone_number(q.get("phone"))
-            # If phone is not provided, we list recent calls for the client
-            # using TsIndex (GSI: PK=client_id, SK=ts)
-            
-            ts_from = q.get("from")
-            ts_to = q.get("to")
-            limit = int(q.get("limit") or 50)
-            order = (q.get("order") or "asc").lower()  # 'asc' | 'desc'
-            next_token = None
-            if "next_token" in q and q["next_token"]:
-                try:
-                    next_token = json.loads(q["next_token"])
-                except Exception:
-                    next_token = None
-
-            if phone:
-                # Query by client_id & sk prefix
-                prefix = phone + "#"
-                kwargs = {
-                    "KeyConditionExpression": Key("client_id").eq(client_id) & Key("sk").begins_with(prefix),
-                    "ScanIndexForward": False if order == "desc" else True,
-                    "Limit": limit,
-                }
-                # Time range filtering for specific phone is tricky with composite key prefix.
-                # If ts_from/to is provided, we can't easily use begins_with prefix AND range on sk.
-                # But since sk = phone#ts, we can construct range keys:
-                # start_sk = phone#ts_from, end_sk = phone#ts_to
-                if ts_from or ts_to:
-                    s_min = ts_from or "0000"
-                    s_max = ts_to or "9999"
-                    # Overwrite condition
-                    kwargs["KeyConditionExpression"] = Key("client_id").eq(client_id) & Key("sk").between(f"{phone}#{s_min}", f"{phone}#{s_max}")
-            else:
-                # Query all calls for client using GSI
-                kwargs = {
-                    "IndexName": "TsIndex",
-                    "KeyConditionExpression": Key("client_id").eq(client_id),
-                    "ScanIndexForward": False if order == "desc" else True,
-                    "Limit": limit,
-                }
-                if ts_from and ts_to:
-                    kwargs["KeyConditionExpression"] = Key("client_id").eq(client_id) & Key("ts").between(ts_from, ts_to)
-                elif ts_from:
-                    kwargs["KeyConditionExpression"] = Key("client_id").eq(client_id) & Key("ts").gte(ts_from)
-                elif ts_to:
-                    kwargs["KeyConditionExpression"] = Key("client_id").eq(client_id) & Key("ts").lte(ts_to)
-
-            if next_token:
-                kwargs["ExclusiveStartKey"] = next_token
-
-            r = _table.query(**kwargs)
-            return _resp(200, {"ok": True, "items": r.get("Items", []), "next_token": r.get("LastEvaluatedKey")})
-
-        # List distinct phones
-        if method == "GET" and path.startswith("/phones"):
-            try:
-                phones = set()
-                last_key = None
-                # Use Query instead of Scan (efficient tenant isolation)
-                # Query TsIndex (all items for this client)
-                while True:
-                    kwargs = {
-                        "IndexName": "TsIndex",
-                        "KeyConditionExpression": Key("client_id").eq(client_id),
-                        "Limit": 500,
-                        "ProjectionExpression": "phone_number" # optimize fetch
-                    }
-                    if last_key:
-                        kwargs["ExclusiveStartKey"] = last_key
-                    r = _table.query(**kwargs)
-                    for it in r.get("Items", []):
-                        pn = it.get("phone_number")
-                        if pn:
-                            norm = _normalize_phone_number(pn)
-                            if norm:
-                                phones.add(norm)
-                    last_key = r.get("LastEvaluatedKey")
-                    if not last_key or len(phones) >= 1000:
-                        break
-                return _resp(200, {"ok": True, "items": sorted(list(phones))})
-            except Exception as e:
-                print(f"[ueki-calllogs] /phones error: {e}", flush=True)
-                return _resp(500, {"ok": False, "error": str(e)})
-
-        # Create call log
-        if method == "POST" and path == "/call":
-            body = json.loads(event.get("body") or "{}")
-            phone = _normalize_phone_number(body.get("phone_number"))
-            if not phone:
-                return _resp(400, {"ok": False, "error": "phone_number required"})
-            ts = body.get("ts") or _now_iso()
-            user_text = body.get("user_text") or ""
-            assistant_text = body.get("assistant_text") or ""
-            call_sid = body.get("call_sid") or body.get("callSid") or ""
-            
-            sk = f"{phone}#{ts}"
-            item = {
-                "client_id": client_id,
-                "sk": sk,
-                "phone_number": phone,
-                "ts": ts,
-                "user_text": user_text,
-                "assistant_text": assistant_text,
-                **({"call_sid": call_sid} if call_sid else {}),
-            }
-            _table.put_item(Item=item)
-            return _resp(200, {"ok": True, "item": item})
-
-        # Get call log(s)
-        if method == "GET" and path == "/call":
-            q = _parse_query(event)
-            phone = _normalize_phone_number(q.get("phone"))
-            ts = q.get("ts")
-            call_sid = q.get("call_sid") or q.get("callSid")
-            
-            if call_sid and not (phone and ts):
-                # Lookup by GSI CallSidIndex
-                items_acc = []
-                last_key = None
-                while True:
-                    kwargs = {
-                        "IndexName": "CallSidIndex",
-                        "KeyConditionExpression": Key("call_sid").eq(call_sid),
-                        "Limit": 200,
-                    }
-                    if last_key:
-                        kwargs["ExclusiveStartKey"] = last_key
-                    r = _table.query(**kwargs)
-                    items_acc.extend(r.get("Items", []))
-                    last_key = r.get("LastEvaluatedKey")
-                    if not last_key:
-                        break
-                # Tenant filtering (safety)
-                items_acc = [it for it in items_acc if it.get("client_id") == client_id]
-                
-                if not items_acc:
-                    return _resp(404, {"ok": False, "error": "not found"})
-                return _resp(200, {"ok": True, "items": items_acc})
-                
-            if not phone or not ts:
-                return _resp(400, {"ok": False, "error": "phone and ts required (or provide call_sid)"})
-            
-            sk = f"{phone}#{ts}"
-            r = _table.get_item(Key={"client_id": client_id, "sk": sk})
-            it = r.get("Item")
-            if not it:
-                return _resp(404, {"ok": False, "error": "not found"})
-            return _resp(200, {"ok": True, "item": it})
-
-        # Update call log
-        if method == "PUT" and path == "/call":
-            body = json.loads(event.get("body") or "{}")
-            phone = _normalize_phone_number(body.get("phone_number"))
-            ts = body.get("ts")
-            if not phone or not ts:
-                return _resp(400, {"ok": False, "error": "phone_number and ts required"})
-            
-            sk = f"{phone}#{ts}"
-            expr = []
-            values = {}
-            if "user_text" in body:
-                expr.append("user_text = :u")
-                values[":u"] = body.get("user_text")
-            if "assistant_text" in body:
-                expr.append("assistant_text = :a")
-                values[":a"] = body.get("assistant_text")
-            if "call_sid" in body or "callSid" in body:
-                expr.append("call_sid = :c")
-                values[":c"] = body.get("call_sid") or body.get("callSid")
-            if not expr:
-                return _resp(400, {"ok": False, "error": "nothing to update"})
-            r = _table.update_item(
-                Key={"client_id": client_id, "sk": sk},
-                UpdateExpression="SET " + ", ".join(expr),
-                ExpressionAttributeValues=values,
-                ConditionExpression="attribute_exists(client_id) AND attribute_exists(sk)",
-                ReturnValues="ALL_NEW",
-            )
-            return _resp(200, {"ok": True, "item": r.get("Attributes")})
-
-        # Delete call log(s)
-        if method == "DELETE" and path.startswith("/call"):
-            q = _parse_query(event)
-            phone = _normalize_phone_number(q.get("phone"))
-            ts = q.get("ts")
-            call_sid = q.get("call_sid") or q.get("callSid")
-            
-            if call_sid and not (phone and ts):
-                # delete all items by call_sid via GSI scan + per-item delete
-                items_acc = []
-                last_key = None
-                while True:
-                    kwargs = {
-                        "IndexName": "CallSidIndex",
-                        "KeyConditionExpression": Key("call_sid").eq(call_sid),
-                        "Limit": 200,
-                    }
-                    if last_key:
-                        kwargs["ExclusiveStartKey"] = last_key
-                    r = _table.query(**kwargs)
-                    items_acc.extend(r.get("Items", []))
-                    last_key = r.get("LastEvaluatedKey")
-                    if not last_key:
-                        break
-                # Tenant filter
-                items_acc = [it for it in items_acc if it.get("client_id") == client_id]
-                
-                # delete one by one
-                for it in items_acc:
-                    pk = it.get("client_id")
-                    sk = it.get("sk")
-                    if pk and sk:
-                        _table.delete_item(
-                            Key={"client_id": pk, "sk": sk},
-                            ConditionExpression="attribute_exists(client_id) AND attribute_exists(sk)",
-                        )
-                return _resp(200, {"ok": True, "deleted": len(items_acc)})
-                
-            if not phone or not ts:
-                return _resp(400, {"ok": False, "error": "phone and ts required (or provide call_sid)"})
-            
-            sk = f"{phone}#{ts}"
-            _table.delete_item(
-                Key={"client_id": client_id, "sk": sk},
-                ConditionExpression="attribute_exists(client_id) AND attribute_exists(sk)",
-            )
-            return _resp(200, {"ok": True})
+        fn = _ROUTES.get((method, path))
+        if fn is None:
+            for m, prefix, prefix_fn in _PREFIX_ROUTES:
+                if m == method and path.startswith(prefix):
+                    fn = prefix_fn
+                    break
+        if fn is not None:
+            return fn(event, client_id, path)
 
         return _resp(404, {"ok": False, "error": "route not found"})
 
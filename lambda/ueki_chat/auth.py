@@ -2,7 +2,8 @@ import os
 import json
 import base64
 import time
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 # For Cognito JWT verification, we'd typically use a library like python-jose or PyJWT.
 # However, standard Lambda environments don't include these by default without layers.
@@ -15,15 +16,29 @@ from typing import Optional
 # 3. [NEW] Parse Authorization header (JWT) manually if Authorizer is disabled or bypassed.
 # 4. Fallback: Default to 'ueki' for backward compatibility during migration.
 
+try:  # optional: bundled via a layer when available
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+# Bearer token -> (expires_at, custom:tenant_id); warm containers see the same
+# token on every request of a burst, so decode it once.
+_JWT_CACHE: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+_JWT_CACHE_MAX = 512
+_JWT_CACHE_TTL = 60.0
+
 def get_client_id(event: dict) -> str:
     headers = event.get("headers") or {}
-    
+    # HTTP API (payload v2.0) already lowercases header names; other shapes
+    # (v1 payloads / direct invokes) get one lowercased copy
+    if event.get("version") != "2.0":
+        headers = {k.lower(): v for k, v in headers.items()}
+
     # 1. Check explicit header (for Realtime API server or debug)
-    # headers are case-insensitive in APIGateway v2 usually, but let's be safe
-    for k, v in headers.items():
-        if k.lower() == "x-client-id":
-            return v
-    
+    if (cid := headers.get("x-client-id")):
+        return cid
+    auth_header = headers.get("authorization")
+
     # 2. Check Authorizer context (if Cognito Authorizer is enabled in APIGateway)
     # requestContext -> authorizer -> jwt -> claims -> custom:tenant_id
     try:
@@ -38,31 +53,33 @@ def get_client_id(event: dict) -> str:
     # This acts as a fallback when API Gateway Authorizer is not enabled or for testing.
     # WARNING: This performs NO signature verification. Use only if API Gateway validates it
     # or in trusted environments. Ideally, use a Lambda Layer with python-jose.
-    auth_header = None
-    for k, v in headers.items():
-        if k.lower() == "authorization":
-            auth_header = v
-            break
-            
     if auth_header and auth_header.startswith("Bearer "):
-        try:
-            token = auth_header.split(" ")[1]
-            parts = token.split('.')
-            if len(parts) == 3:
-                payload_segment = parts[1]
-                # Add padding if needed
-                rem = len(payload_segment) % 4
-                if rem > 0:
-                    payload_segment += '=' * (4 - rem)
-                
-                payload_bytes = base64.urlsafe_b64decode(payload_segment)
-                payload = json.loads(payload_bytes)
-                tenant = payload.get("custom:tenant_id")
-                if tenant:
-                    return tenant
-        except Exception as e:
-            print(f"JWT manual parsing failed: {e}")
-            pass
+        token = auth_header[7:].partition(" ")[0]
+        hit = _JWT_CACHE.get(token)
+        if hit is not None and hit[0] > time.monotonic():
+            _JWT_CACHE.move_to_end(token)
+            if hit[1]:
+                return hit[1]
+        else:
+            try:
+                # header.payload.signature; only the payload is decoded
+                header, _, rest = token.partition(".")
+                payload_segment, _, signature = rest.partition(".")
+                if header and payload_segment and signature and "." not in signature:
+                    # over-padding is ignored by the decoder, so no length check needed
+                    payload_bytes = base64.urlsafe_b64decode(payload_segment + "==")
+                    payload = _loads(payload_bytes)
+                    tenant = payload.get("custom:tenant_id")
+                    # keep only the extracted tenant, not the whole payload
+                    _JWT_CACHE[token] = (time.monotonic() + _JWT_CACHE_TTL, tenant)
+                    _JWT_CACHE.move_to_end(token)
+                    if len(_JWT_CACHE) > _JWT_CACHE_MAX:
+                        _JWT_CACHE.popitem(last=False)
+                    if tenant:
+                        return tenant
+            except Exception as e:
+                print(f"JWT manual parsing failed: {e}")
+                pass
 
     # 4. Fallback default
     return "ueki"
@@ -1,34 +1,174 @@
+import hashlib
 import json
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-import traceback
-from typing import List, Dict, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Callable, Tuple
 from decimal import Decimal
 
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
-import urllib.request
+import urllib3
 import auth  # Local auth helper
 
+try:  # optional C encoder/decoder; stdlib json is the fallback
+    import orjson
+
+    def _dumpb(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumpb(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+    _loads = json.loads
+
+try:  # optional; without it tool arguments go to the tool unchecked
+    from jsonschema import Draft7Validator
+except ImportError:  # not in the ueki_chat zip; only a layer providing it enables validation
+    Draft7Validator = None
+
+
+def _dumps(obj: Any) -> str:
+    return _dumpb(obj).decode("utf-8")
+
 CALLS_TABLE_NAME = os.getenv("CALL_LOGS_TABLE_NAME", "ueki-chatbot")
 FAQ_TABLE_NAME = os.getenv("FAQ_TABLE_NAME", "ueki-faq")
 PROMPTS_TABLE_NAME = os.getenv("PROMPTS_TABLE_NAME", "ueki-prompts")
 TASKS_TABLE_NAME = os.getenv("TASKS_TABLE_NAME", "ueki-tasks")
+PHONES_TABLE_NAME = os.getenv("PHONES_TABLE_NAME") or ""
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_PROJECT = os.getenv("OPENAI_PROJECT", "")
 OPENAI_ORG = os.getenv("OPENAI_ORG", os.getenv("OPENAI_ORGANIZATION", ""))
 OPENAI_SECRET_NAME = os.getenv("OPENAI_SECRET_NAME", "")
 OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
-
-_ddb = boto3.resource("dynamodb")
-_calls = _ddb.Table(CALLS_TABLE_NAME)
-_faq = _ddb.Table(FAQ_TABLE_NAME)
-_prompts = _ddb.Table(PROMPTS_TABLE_NAME)
-_tasks = _ddb.Table(TASKS_TABLE_NAME)
+# Opt-in: request SSE and assemble the completion while it streams in
+OPENAI_STREAM = os.getenv("OPENAI_STREAM", "").lower() in ("1", "true", "yes")
+
+# Keep-alive sockets survive across warm invocations; one /chat turn makes
+# several DynamoDB calls, so reuse matters more than per-call timeouts.
+_DDB_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=32,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    connect_timeout=1,
+    read_timeout=2,
+)
+_AWS_CONFIG = Config(tcp_keepalive=True, retries={"max_attempts": 3, "mode": "standard"})
+
+# boto3 sessions and resources are not thread-safe, and /chat reads through
+# _executor workers, so each thread gets its own session, resource and Tables.
+_tls = threading.local()
+
+
+def _ddb() -> Any:
+    r = getattr(_tls, "ddb", None)
+    if r is None:
+        r = _tls.ddb = boto3.session.Session().resource("dynamodb", config=_DDB_CONFIG)
+        _tls.tables = {}
+    return r
+
+
+class _LazyTable:
+    """Resolves this thread's Table resource on first attribute access; most routes touch one or two tables."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        ddb = _ddb()
+        t = _tls.tables.get(self.name)
+        if t is None:
+            t = _tls.tables[self.name] = ddb.Table(self.name)
+        return getattr(t, attr)
+
+
+_calls = _LazyTable(CALLS_TABLE_NAME)
+_faq = _LazyTable(FAQ_TABLE_NAME)
+_prompts = _LazyTable(PROMPTS_TABLE_NAME)
+_tasks = _LazyTable(TASKS_TABLE_NAME)
+_phones = _LazyTable(PHONES_TABLE_NAME) if PHONES_TABLE_NAME else None
+
+_secrets = boto3.client("secretsmanager", config=_AWS_CONFIG) if OPENAI_SECRET_NAME else None
+_logs = None  # created on first /chat-logs request
+# Reused across warm invocations for the independent per-turn DynamoDB reads
+_executor = ThreadPoolExecutor(max_workers=3)
 
 LOG_GROUP_NAME = "/aws/lambda/ueki-chat"
+LOGS_QUERY_MAX_WAIT_SECS = 5.0
+
+# Keep-alive HTTPS pools (urllib3 ships with botocore): one for api.openai.com,
+# one for tenant-configured ext tools (arbitrary hosts).
+_openai_http = urllib3.PoolManager(maxsize=4, block=False, timeout=urllib3.Timeout(connect=3.0, read=10.0))
+_ext_http = urllib3.PoolManager(
+    num_pools=16,
+    maxsize=4,
+    block=False,
+    # follow redirects like urlopen did, but never re-send a tool request
+    retries=urllib3.Retry(total=5, connect=0, read=0, status=0, other=0, redirect=5),
+)
+
+FAQ_KB_TTL_SECS = 60
+FAQ_KB_MAX_ITEMS = 1000
+# Entries longer than this (question + answer) are left out of the prompt
+FAQ_KB_ITEM_MAX_CHARS = 2000
+PROMPT_CACHE_TTL_SECS = 30
+# Re-read the secret occasionally so a rotated key is picked up without a redeploy
+OPENAI_CREDS_TTL_SECS = 900
+
+_creds_cache: Optional[Dict[str, Optional[str]]] = None
+_creds_expires = 0.0
+
+# In-process TTL cache for per-tenant data that rarely changes between turns
+_cache: Dict[Any, Tuple[float, Any]] = {}
+
+
+def _cached(key: Any, ttl: float, loader: Callable[[], Any]) -> Any:
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    value = loader()
+    _cache[key] = (now + ttl, value)
+    return value
+
+
+def _get_logs_client():
+    global _logs
+    if _logs is None:
+        _logs = boto3.client("logs", config=_AWS_CONFIG)
+    return _logs
+
+
+def _insights_row_to_item(row: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Map a Logs Insights result row to the filter_log_events item shape."""
+    f = {c.get("field"): c.get("value") for c in row}
+
+    def _ms(v: Optional[str]) -> Optional[int]:
+        # Insights returns "YYYY-MM-DD HH:MM:SS.mmm" in UTC
+        if not v:
+            return None
+        try:
+            dt = datetime.strptime(v, "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=timezone.utc)
+            return int(dt.timestamp() * 1000)
+        except ValueError:
+            return None
+
+    return {
+        "timestamp": _ms(f.get("@timestamp")),
+        "ingestionTime": _ms(f.get("@ingestionTime")),
+        "message": f.get("@message"),
+        "logStreamName": f.get("@logStream"),
+        "eventId": f.get("@ptr"),
+    }
 
 
 def _now_iso():
@@ -56,11 +196,18 @@ def _resp(status: int, body: dict):
             "Access-Control-Allow-Headers": "*",
             "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
         },
-        "body": json.dumps(body, ensure_ascii=False, default=_json_default),
+        "body": _dumps(body),
     }
 
 
+# ASCII chars other than 0-9 and '+' -> deleted by str.translate (runs in C)
+_DIGITS_DEL_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if chr(c) not in "0123456789+"))
+
+
 def _digits_only(s: str) -> str:
+    if s.isascii():
+        return s.translate(_DIGITS_DEL_TABLE)
+    # non-ASCII input (e.g. full-width digits): keep str.isdigit semantics
     return "".join(ch for ch in s if ch.isdigit() or ch == '+')
 
 
@@ -81,69 +228,135 @@ def _normalize_phone_number(raw: Optional[str]) -> Optional[str]:
     return s
 
 
+def _prompt_cache_key(client_id: str, prompt_id: str) -> Tuple[str, str, str]:
+    return ("prompt", client_id, prompt_id)
+
+
+def _load_prompt_content(client_id: str, prompt_id: str) -> Any:
+    r = _prompts.get_item(Key={"client_id": client_id, "id": prompt_id})
+    item = r.get("Item")
+    return item.get("content") if item else None
+
+
+def _load_json_config(client_id: str, prompt_id: str, default: Dict) -> Dict:
+    return _parse_json_config(_load_prompt_content(client_id, prompt_id), default)
+
+
+def _parse_json_config(raw: Any, default: Dict) -> Dict:
+    if raw:
+        if isinstance(raw, str):
+            try:
+                return _loads(raw)
+            except ValueError:
+                return default
+        if isinstance(raw, dict):
+            return raw
+    return default
+
+
+def _put_prompts_batch(client_id: str, updates: Dict[str, Any]) -> None:
+    """Write prompt items ({id: content}) with one BatchWriteItem and drop their cache entries."""
+    now = _now_iso()
+    requests = [
+        {"PutRequest": {"Item": {"client_id": client_id, "id": pid, "content": content, "updated_at": now}}}
+        for pid, content in updates.items()
+    ]
+    try:
+        for attempt in range(4):
+            if attempt:
+                time.sleep(0.05 * (2 ** attempt))
+            r = _ddb().batch_write_item(RequestItems={PROMPTS_TABLE_NAME: requests})
+            requests = r.get("UnprocessedItems", {}).get(PROMPTS_TABLE_NAME)
+            if not requests:
+                return
+        raise RuntimeError("prompt update throttled, please retry")
+    finally:
+        for pid in updates:
+            _cache.pop(_prompt_cache_key(client_id, pid), None)
+
+
 def _read_system_prompt(client_id: str) -> str:
-    # Try to load from prompts table (id = 'system')
+    # Try to load from prompts table (id = 'system'); DB errors are not cached
     try:
-        r = _prompts.get_item(Key={"client_id": client_id, "id": "system"})
-        item = r.get("Item")
-        if item and item.get("content"):
-            return str(item.get("content"))
+        content = _cached(
+            _prompt_cache_key(client_id, "system"), PROMPT_CACHE_TTL_SECS,
+            lambda: _load_prompt_content(client_id, "system"),
+        )
+        if content:
+            return str(content)
     except (BotoCoreError, ClientError):
         pass
     # Fallback default if nothing in DB
     return ""
 
 def _put_system_prompt(client_id: str, markdown: str) -> None:
-    _prompts.put_item(Item={
-        "client_id": client_id,
-        "id": "system",
-        "content": markdown,
-        "updated_at": _now_iso(),
-    })
+    _put_prompts_batch(client_id, {"system": markdown})
 
 def _read_func_config(client_id: str) -> Dict:
     try:
-        r = _prompts.get_item(Key={"client_id": client_id, "id": "functions"})
-        item = r.get("Item")
-        if item and item.get("content"):
-            raw = item.get("content")
-            if isinstance(raw, str):
-                return json.loads(raw)
-            if isinstance(raw, dict):
-                return raw
+        return _cached(
+            _prompt_cache_key(client_id, "functions"), PROMPT_CACHE_TTL_SECS,
+            lambda: _load_json_config(client_id, "functions", {"tools": [], "instructions": ""}),
+        )
     except Exception:
         pass
     return {"tools": [], "instructions": ""}
 
 def _put_func_config(client_id: str, cfg: Dict) -> None:
-    _prompts.put_item(Item={
-        "client_id": client_id,
-        "id": "functions",
-        "content": cfg,
-        "updated_at": _now_iso(),
-    })
+    _put_prompts_batch(client_id, {"functions": cfg})
 
 def _read_ext_tools(client_id: str) -> Dict:
     try:
-        r = _prompts.get_item(Key={"client_id": client_id, "id": "ext-tools"})
-        item = r.get("Item")
-        if item and item.get("content"):
-            raw = item.get("content")
-            if isinstance(raw, str):
-                return json.loads(raw)
-            if isinstance(raw, dict):
-                return raw
+        return _cached(
+            _prompt_cache_key(client_id, "ext-tools"), PROMPT_CACHE_TTL_SECS,
+            lambda: _load_json_config(client_id, "ext-tools", {"ext_tools": []}),
+        )
     except Exception:
         pass
     return {"ext_tools": []}
 
 def _put_ext_tools(client_id: str, cfg: Dict) -> None:
-    _prompts.put_item(Item={
-        "client_id": client_id,
-        "id": "ext-tools",
-        "content": cfg,
-        "updated_at": _now_iso(),
-    })
+    _put_prompts_batch(client_id, {"ext-tools": cfg})
+
+
+def _read_prompts_batch(client_id: str) -> Tuple[Dict, Dict]:
+    """(functions, ext-tools) configs; cache misses are fetched with one BatchGetItem."""
+    defaults = {"functions": {"tools": [], "instructions": ""}, "ext-tools": {"ext_tools": []}}
+    now = time.monotonic()
+    out: Dict[str, Dict] = {}
+    missing: List[str] = []
+    for pid in defaults:
+        hit = _cache.get(_prompt_cache_key(client_id, pid))
+        if hit is not None and hit[0] > now:
+            out[pid] = hit[1]
+        else:
+            missing.append(pid)
+    if missing:
+        try:
+            contents: Optional[Dict[str, Any]] = {}
+            keys = [{"client_id": client_id, "id": pid} for pid in missing]
+            for attempt in range(3):
+                if attempt:
+                    time.sleep(0.05 * attempt)
+                r = _ddb().batch_get_item(RequestItems={PROMPTS_TABLE_NAME: {"Keys": keys}})
+                for it in r.get("Responses", {}).get(PROMPTS_TABLE_NAME, []):
+                    contents[it.get("id")] = it.get("content")
+                keys = r.get("UnprocessedKeys", {}).get(PROMPTS_TABLE_NAME, {}).get("Keys")
+                if not keys:
+                    break
+            else:
+                contents = None  # still throttled; don't cache a partial view
+        except Exception:
+            contents = None
+        for pid in missing:
+            if contents is None:
+                out[pid] = defaults[pid]
+                continue
+            value = _parse_json_config(contents.get(pid), defaults[pid])
+            _cache[_prompt_cache_key(client_id, pid)] = (now + PROMPT_CACHE_TTL_SECS, value)
+            out[pid] = value
+    return out["functions"], out["ext-tools"]
+
 
 # ---- Tools (Function Calling) implementations ----
 def _tool_list_tasks(client_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
@@ -162,6 +375,7 @@ def _tool_create_task(client_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
     address = args.get("address") or ""
     if not name:
         return {"error": "name is required"}
+    now = _now_iso()
     item = {
         "client_id": client_id,
         "name": str(name),
@@ -169,8 +383,8 @@ def _tool_create_task(client_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
         "start_datetime": str(start_datetime),
         "phone_number": str(phone_number),
         "address": str(address),
-        "created_at": _now_iso(),
-        "updated_at": _now_iso(),
+        "created_at": now,
+        "updated_at": now,
     }
     _tasks.put_item(Item=item)
     # Return item without internal keys if possible, but for simplicity returning all
@@ -186,33 +400,51 @@ def _tool_get_task(client_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
         return {"error": "not found"}
     return {"item": it}
 
+# (tool arg, DB attribute); legacy aliases come after their primary so the primary wins
+_UPDATE_FIELDS = (
+    ("request", "request"),
+    ("start_datetime", "start_datetime"),
+    ("phone_number", "phone_number"),
+    ("address", "address"),
+    ("requirement", "request"),
+    ("start_date", "start_datetime"),
+)
+# arg -> (value placeholder, attribute), built once
+_UPD_CACHE = {src: (f":{dst}", dst) for src, dst in _UPDATE_FIELDS}
+_UPD_COLUMNS = tuple(dict.fromkeys(dst for _, dst in _UPDATE_FIELDS))
+
+
+@lru_cache(maxsize=64)
+def _update_expr(provided: frozenset) -> Tuple[str, Dict[str, str]]:
+    """UpdateExpression and attribute names for a set of columns (at most 2^4 shapes)."""
+    cols = [c for c in _UPD_COLUMNS if c in provided]
+    expr = "SET " + ", ".join(f"#{c} = :{c}" for c in cols) + ", #updated_at = :u"
+    names = {f"#{c}": c for c in cols}
+    names["#updated_at"] = "updated_at"
+    return expr, names
+
+
 def _tool_update_task(client_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
     name = args.get("name")
     if not name:
         return {"error": "name is required"}
-    expr = []
     values: Dict[str, Any] = {":u": _now_iso()}
-    names: Dict[str, str] = {"#updated_at": "updated_at"}
-    updates = {
-        "request": args.get("request"),
-        "start_datetime": args.get("start_datetime"),
-        "phone_number": args.get("phone_number"),
-        "address": args.get("address"),
-        "request@legacy": args.get("requirement"),
-        "start_datetime@legacy": args.get("start_date"),
-    }
-    for k, v in updates.items():
+    provided = set()
+    for src, _ in _UPDATE_FIELDS:
+        v = args.get(src)
         if v is None:
             continue
-        db_key = k.split("@", 1)[0]
-        expr.append(f"#{db_key} = :{db_key}")
-        values[f":{db_key}"] = str(v)
-        names[f"#{db_key}"] = db_key
-    if not expr:
+        vkey, dst = _UPD_CACHE[src]
+        if dst in provided:
+            continue  # already set from the primary arg
+        provided.add(dst)
+        values[vkey] = str(v)
+    if not provided:
         return {"error": "nothing to update"}
+    update_expr, names = _update_expr(frozenset(provided))
     r = _tasks.update_item(
         Key={"client_id": client_id, "name": str(name)},
-        UpdateExpression="SET " + ", ".join(expr) + ", #updated_at = :u",
+        UpdateExpression=update_expr,
         ExpressionAttributeValues=values,
         ExpressionAttributeNames=names,
         ReturnValues="ALL_NEW",
@@ -235,31 +467,44 @@ _TOOLS_IMPL = {
 }
 
 
-def _fetch_faq_kb_text(client_id: str) -> str:
-    items: List[Dict] = []
-    last_key = None
-    # Use Query instead of Scan for tenant isolation
-    for _ in range(5): # Limit pages
-        kwargs = {
-            "KeyConditionExpression": Key("client_id").eq(client_id),
-            "Limit": 200
-        }
-        if last_key:
-            kwargs["ExclusiveStartKey"] = last_key
-        r = _faq.query(**kwargs)
+def _load_faq_kb_text(client_id: str) -> str:
+    # Use Query instead of Scan for tenant isolation; one page covers most tenants
+    kwargs = {
+        "KeyConditionExpression": Key("client_id").eq(client_id),
+        "ProjectionExpression": "#q, #a",
+        "ExpressionAttributeNames": {"#q": "question", "#a": "answer"},
+        "Limit": 500,
+    }
+    r = _faq.query(**kwargs)
+    items: List[Dict] = r.get("Items", [])
+    last_key = r.get("LastEvaluatedKey")
+    while last_key and len(items) < FAQ_KB_MAX_ITEMS:
+        r = _faq.query(ExclusiveStartKey=last_key, **kwargs)
         items.extend(r.get("Items", []))
         last_key = r.get("LastEvaluatedKey")
-        if not last_key:
-            break
-    data = [
-        {"question": it.get("question"), "answer": it.get("answer")}
-        for it in items
-        if it.get("question") and it.get("answer")
-    ]
-    try:
-        return json.dumps(data, ensure_ascii=False)
-    except Exception:
-        return ""
+    # pages are Limit 500, so the last one can overshoot the cap
+    del items[FAQ_KB_MAX_ITEMS:]
+    # Compact "Q:/A:" blocks: roughly half the bytes (and tokens) of the JSON form
+    blocks: List[str] = []
+    dropped = 0
+    for it in items:
+        q = it.get("question")
+        a = it.get("answer")
+        if not q or not a:
+            continue
+        q = str(q)
+        a = str(a)
+        if len(q) + len(a) > FAQ_KB_ITEM_MAX_CHARS:
+            dropped += 1
+            continue
+        blocks.append(f"Q: {q}\nA: {a}")
+    if dropped:
+        print(f"[ueki-chat] FAQ_KB client={client_id} dropped {dropped} oversized entries", flush=True)
+    return "\n\n".join(blocks)
+
+
+def _fetch_faq_kb_text(client_id: str) -> str:
+    return _cached(("faq_kb", client_id), FAQ_KB_TTL_SECS, lambda: _load_faq_kb_text(client_id))
 
 
 def _fetch_history_messages(client_id: str, phone_number: str, limit: int = 20, call_sid: Optional[str] = None) -> List[Dict]:
@@ -278,10 +523,13 @@ def _fetch_history_messages(client_id: str, phone_number: str, limit: int = 20,
         # NOTE: Changing storage format to SK=`phone_number#ts`
         prefix = phone_number + "#"
         
+        # Newest first with a tight Limit (each item yields up to two messages),
+        # reversed below into chronological order for the model
         kwargs = {
             "KeyConditionExpression": Key("client_id").eq(client_id) & Key("sk").begins_with(prefix),
-            "ScanIndexForward": True, # Oldest first
-            "Limit": 50 # fetch a bit more then filter
+            "ScanIndexForward": False,
+            "Limit": limit,
+            "ProjectionExpression": "user_text, assistant_text",
         }
         
         # If call_sid is provided, we can use GSI CallSidIndex (PK=call_sid) 
@@ -290,7 +538,9 @@ def _fetch_history_messages(client_id: str, phone_number: str, limit: int = 20,
              kwargs = {
                 "IndexName": "CallSidIndex",
                 "KeyConditionExpression": Key("call_sid").eq(call_sid),
-                "Limit": 200
+                "Limit": 200,
+                # client_id is only needed for the tenant filter below
+                "ProjectionExpression": "user_text, assistant_text, client_id",
              }
         
         r = _calls.query(**kwargs)
@@ -299,6 +549,8 @@ def _fetch_history_messages(client_id: str, phone_number: str, limit: int = 20,
         # Filter for safety (in case of call_sid collision across tenants? unlikely but good practice)
         if call_sid:
             items = [it for it in items if it.get("client_id") == client_id]
+        else:
+            items = items[::-1]
         
         # If not call_sid, we used prefix, so items are already for this phone.
         # But we need to sort by TS. SK is phone#ts, so it is sorted by phone then ts.
@@ -339,11 +591,17 @@ def _log_turn(client_id: str, phone_number: str, user_text: str, assistant_text:
             item["call_sid"] = call_sid
             
         _calls.put_item(Item=item)
+        if _phones is not None:
+            # keep the per-tenant phone index used by GET /phones in sync
+            _phones.put_item(Item={"client_id": client_id, "phone_number": normalized})
     except (BotoCoreError, ClientError):
         pass
 
 
 def _resolve_openai_credentials() -> Dict[str, Optional[str]]:
+    global _creds_cache, _creds_expires
+    if _creds_cache is not None and _creds_expires > time.monotonic():
+        return _creds_cache
     # Prefer environment variables
     api_key = OPENAI_API_KEY or None
     project = OPENAI_PROJECT or None
@@ -354,8 +612,7 @@ def _resolve_openai_credentials() -> Dict[str, Optional[str]]:
 
     if OPENAI_SECRET_NAME:
         try:
-            sm = boto3.client("secretsmanager")
-            r = sm.get_secret_value(SecretId=OPENAI_SECRET_NAME)
+            r = _secrets.get_secret_value(SecretId=OPENAI_SECRET_NAME)
             secret = r.get("SecretString") or ""
             if secret.startswith("{"):
                 try:
@@ -390,7 +647,53 @@ def _resolve_openai_credentials() -> Dict[str, Optional[str]]:
         except Exception:
             print("[ueki-chat] Failed to fetch secret from Secrets Manager", flush=True)
 
-    return {"api_key": api_key, "project": project, "organization": organization}
+    creds = {"api_key": api_key, "project": project, "organization": organization}
+    if api_key:
+        # only successful resolutions are cached; a failed fetch is retried next call
+        _creds_cache = creds
+        _creds_expires = time.monotonic() + OPENAI_CREDS_TTL_SECS
+    return creds
+
+def _read_openai_stream(resp) -> Dict[str, Any]:
+    """Assemble a chat.completions SSE stream into the non-streaming response shape."""
+    content: List[str] = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    buf = b""
+    done = False
+    for chunk in resp.stream(1024):
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                done = True
+                break
+            choices = _loads(data).get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta") or {}
+            if delta.get("content"):
+                content.append(delta["content"])
+            for tc in delta.get("tool_calls") or []:
+                # first delta per index carries id/name; later ones append argument text
+                acc = tool_calls.setdefault(tc.get("index", 0), {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+                if tc.get("id"):
+                    acc["id"] = tc["id"]
+                fn = tc.get("function") or {}
+                if fn.get("name"):
+                    acc["function"]["name"] += fn["name"]
+                if fn.get("arguments"):
+                    acc["function"]["arguments"] += fn["arguments"]
+        if done:
+            break
+    message: Dict[str, Any] = {"role": "assistant", "content": "".join(content) or None}
+    if tool_calls:
+        message["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+    return {"choices": [{"message": message}]}
+
 
 def _call_openai_raw(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     creds = _resolve_openai_credentials()
@@ -400,14 +703,14 @@ def _call_openai_raw(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if not key:
         print("[ueki-chat] OPENAI_API_KEY is not available (env or secret)", flush=True)
         return None
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(OPENAI_CHAT_COMPLETIONS_URL, data=data, method="POST")
-    req.add_header("Authorization", f"Bearer {key}")
+    if OPENAI_STREAM:
+        payload = {**payload, "stream": True}
+    data = _dumpb(payload)
+    headers = {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
     if project:
-        req.add_header("OpenAI-Project", project)
+        headers["OpenAI-Project"] = project
     if organization:
-        req.add_header("OpenAI-Organization", organization)
-    req.add_header("Content-Type", "application/json")
+        headers["OpenAI-Organization"] = organization
     try:
         print(
             "[ueki-chat] calling OpenAI chat.completions, messages=",
@@ -420,19 +723,23 @@ def _call_openai_raw(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
             bool(organization),
             flush=True,
         )
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            raw = resp.read()
-            js = json.loads(raw)
-            return js
+        resp = _openai_http.request(
+            "POST", OPENAI_CHAT_COMPLETIONS_URL, body=data, headers=headers,
+            retries=False, preload_content=not OPENAI_STREAM,
+        )
+        if resp.status >= 400:
+            print("[ueki-chat] OpenAI call failed: HTTP", resp.status, "body=", resp.data.decode('utf-8', 'ignore'), flush=True)
+            return None
+        if OPENAI_STREAM:
+            try:
+                return _read_openai_stream(resp)
+            finally:
+                resp.release_conn()
+        return _loads(resp.data)
     except Exception as e:
-        body = None
-        try:
-            body = getattr(e, 'read', None) and e.read()
-            if not body and hasattr(e, 'fp') and getattr(e.fp, 'read', None):
-                body = e.fp.read()
-        except Exception:
-            body = None
-        print("[ueki-chat] OpenAI call failed:", repr(e), "body=", (body.decode('utf-8', 'ignore') if body else None), flush=True)
+        import traceback  # error path only; keep it off the cold-start import list
+
+        print("[ueki-chat] OpenAI call failed:", repr(e), flush=True)
         print(traceback.format_exc(), flush=True)
         return None
 
@@ -455,7 +762,7 @@ def _chat_with_tools(client_id: str, messages: List[Dict]) -> Optional[str]:
     # But tools are called by name from OpenAI.
     # Strategy: Wrap the implementations or inject client_id inside the loop.
     
-    tools = _compile_tools_for_openai(client_id)
+    tools, schemas = _compile_tools_for_openai(client_id)
     if not isinstance(tools, list) or len(tools) == 0:
         return _call_openai(messages)
 
@@ -488,14 +795,18 @@ def _chat_with_tools(client_id: str, messages: List[Dict]) -> Optional[str]:
                 fn_name = tc.get("function", {}).get("name")
                 args_json = tc.get("function", {}).get("arguments") or "{}"
                 try:
-                    args = json.loads(args_json)
+                    args = _loads(args_json)
                 except Exception:
                     args = {}
                 
                 # Execute tool with client_id
                 impl = _TOOLS_IMPL.get(fn_name or "")
                 result: Any
-                if impl:
+                errors = _tool_arg_errors(client_id, fn_name or "", schemas.get(fn_name), args)
+                if errors:
+                    # let the model correct its call without running the tool
+                    result = {"error": "invalid_args", "details": errors}
+                elif impl:
                     try:
                         # Inject client_id as first arg
                         result = impl(client_id, args)
@@ -508,7 +819,7 @@ def _chat_with_tools(client_id: str, messages: List[Dict]) -> Optional[str]:
                     "role": "tool",
                     "tool_call_id": tc.get("id"),
                     "name": fn_name or "",
-                    "content": json.dumps(result, ensure_ascii=False),
+                    "content": _dumps(result),
                 })
             continue
         if content:
@@ -517,12 +828,83 @@ def _chat_with_tools(client_id: str, messages: List[Dict]) -> Optional[str]:
     return None
 
 
-def _compile_tools_for_openai(client_id: str) -> List[Dict[str, Any]]:
+# (client_id, tool name, schema sha1) -> validator, or None for an unusable schema
+_validators: Dict[Tuple[str, str, str], Any] = {}
+_VALIDATORS_MAX = 256
+
+
+def _tool_arg_errors(client_id: str, fn_name: str, schema: Optional[Tuple[Dict, str]], args: Any) -> List[str]:
+    """Schema violations in a tool call's arguments (empty when jsonschema is unavailable).
+
+    schema is (parameters, sha1 digest) from _tool_schemas. Any failure inside
+    jsonschema (bad schema, unresolvable $ref, ...) means "no validation": the
+    tool then runs as it did before validation existed.
+    """
+    if Draft7Validator is None or schema is None:
+        return []
+    params, digest = schema
+    key = (client_id, fn_name, digest)
+    validator = _validators.get(key, False)
+    if validator is False:
+        try:
+            Draft7Validator.check_schema(params)
+            validator = Draft7Validator(params)
+        except Exception:
+            validator = None
+        if len(_validators) >= _VALIDATORS_MAX:
+            _validators.clear()
+        _validators[key] = validator
+    if validator is None:
+        return []
+    try:
+        return [
+            f"{'/'.join(str(p) for p in e.absolute_path) or '$'}: {e.message}"
+            for e in validator.iter_errors(args)
+        ][:10]
+    except Exception as e:
+        print(f"[ueki-chat] skipping arg validation for {fn_name}: {e!r}", flush=True)
+        return []
+
+
+def _tool_schemas(tools: List[Dict[str, Any]]) -> Dict[str, Tuple[Dict, str]]:
+    """tool name -> (parameters, sha1 of the canonical JSON); hashed once per compile."""
+    if Draft7Validator is None:
+        return {}
+    out: Dict[str, Tuple[Dict, str]] = {}
+    for t in tools:
+        fn = t.get("function") if isinstance(t, dict) else None
+        if not isinstance(fn, dict) or not isinstance(fn.get("parameters"), dict):
+            continue
+        params = fn["parameters"]
+        try:
+            digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        except (TypeError, ValueError):
+            continue
+        out[fn.get("name") or ""] = (params, digest)
+    return out
+
+
+# client_id -> (func_cfg, ext_cfg, tools, schemas). The configs come from _cached(), so
+# the same objects are returned until the TTL lapses or a PUT invalidates them;
+# an identity match means the compiled list is still current.
+_tools_compiled: Dict[str, Tuple[Dict, Dict, List[Dict[str, Any]], Dict[str, Tuple[Dict, str]]]] = {}
+
+
+def _compile_tools_for_openai(client_id: str) -> Tuple[List[Dict[str, Any]], Dict[str, Tuple[Dict, str]]]:
+    func_cfg, ext_cfg = _read_prompts_batch(client_id)
+    hit = _tools_compiled.get(client_id)
+    if hit is not None and hit[0] is func_cfg and hit[1] is ext_cfg:
+        return hit[2], hit[3]
+    tools = _build_tools(func_cfg, ext_cfg)
+    schemas = _tool_schemas(tools)
+    _tools_compiled[client_id] = (func_cfg, ext_cfg, tools, schemas)
+    return tools, schemas
+
+
+def _build_tools(func_cfg: Dict, ext_cfg: Dict) -> List[Dict[str, Any]]:
     tools: List[Dict[str, Any]] = []
-    func_cfg = _read_func_config(client_id)
     if isinstance(func_cfg.get("tools"), list):
         tools.extend(func_cfg.get("tools"))
-    ext_cfg = _read_ext_tools(client_id)
     for t in ext_cfg.get("ext_tools", []) or []:
         try:
             name = t.get("name")
@@ -541,11 +923,15 @@ def _compile_tools_for_openai(client_id: str) -> List[Dict[str, Any]]:
             continue
     return tools
 
+# {{name}} placeholders; any key the args dict can hold (not just \w), no nesting
+_TPL_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
 def _template_str(s: str, args: Dict[str, Any]) -> str:
-    out = s
-    for k, v in (args or {}).items():
-        out = out.replace("{{" + str(k) + "}}", str(v))
-    return out
+    if not args or "{{" not in s:
+        return s
+    # single pass; substituted values are never re-scanned for placeholders
+    return _TPL_RE.sub(lambda m: str(args[m.group(1)]) if m.group(1) in args else m.group(0), s)
 
 def _execute_ext_tool(client_id: str, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
     cfg = _read_ext_tools(client_id)
@@ -573,29 +959,31 @@ def _execute_ext_tool(client_id: str, tool_name: str, tool_args: Dict[str, Any])
             body_f = _template_str(str(body_tpl), tool_args or {})
             try:
                 # if looks like JSON, send as json
-                json.loads(body_f)
+                _loads(body_f)
                 data_bytes = body_f.encode("utf-8")
                 if not any(k.lower() == "content-type" for k in hdrs_f.keys()):
                     hdrs_f["Content-Type"] = "application/json"
             except Exception:
                 data_bytes = body_f.encode("utf-8")
 
-        req = urllib.request.Request(url_f, data=data_bytes, method=method)
-        for hk, hv in hdrs_f.items():
-            req.add_header(hk, hv)
-        with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
-            raw = resp.read()
-            text = raw.decode("utf-8", "ignore")
-            try:
-                parsed = json.loads(text)
-            except Exception:
-                parsed = text
-            return {"ok": True, "status": resp.status, "body": parsed}
+        resp = _ext_http.request(method, url_f, body=data_bytes, headers=hdrs_f, timeout=timeout_sec)
+        if resp.status >= 400:
+            # same shape urlopen's HTTPError produced
+            return {"ok": False, "error": f"HTTP Error {resp.status}: {resp.reason}"}
+        text = resp.data.decode("utf-8", "ignore")
+        try:
+            parsed = _loads(text)
+        except Exception:
+            parsed = text
+        return {"ok": True, "status": resp.status, "body": parsed}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
 
 def handler(event, context):
+    # Scheduled warmer ping (EventBridge): keep the sandbox and its caches warm, do no work
+    if event.get("warmer") or event.get("source") == "aws.events":
+        return {"statusCode": 200, "body": "warm"}
     try:
         # Auth: Get Client ID
         client_id = auth.get_client_id(event)
@@ -608,16 +996,20 @@ def handler(event, context):
             return _resp(200, {"ok": True})
 
         if method == "POST" and path == "/chat":
-            body = json.loads(event.get("body") or "{}")
+            body = _loads(event.get("body") or "{}")
             phone_number = _normalize_phone_number(body.get("phone_number"))
             user_text = body.get("user_text")
             call_sid = body.get("call_sid") or body.get("callSid")
             if not phone_number or not user_text:
                 return _resp(400, {"ok": False, "error": "phone_number and user_text required"})
 
-            system_prompt = _read_system_prompt(client_id)
-            faq_kb = _fetch_faq_kb_text(client_id)
-            history = _fetch_history_messages(client_id, phone_number, 20, call_sid)
+            # Independent reads: issue concurrently, wall time ~ the slowest one
+            f_prompt = _executor.submit(_read_system_prompt, client_id)
+            f_faq = _executor.submit(_fetch_faq_kb_text, client_id)
+            f_history = _executor.submit(_fetch_history_messages, client_id, phone_number, 20, call_sid)
+            system_prompt = f_prompt.result()
+            faq_kb = f_faq.result()
+            history = f_history.result()
 
             messages: List[Dict] = []
             if system_prompt:
@@ -632,6 +1024,8 @@ def handler(event, context):
             # Pass client_id to tool execution logic
             reply = _chat_with_tools(client_id, messages) or "申し訳ありません。現在お手続きできません。少し時間をおいてお試しください。"
 
+            # Synchronous: Lambda freezes the sandbox on return, and the next turn
+            # (possibly on another sandbox) reads this one back as history
             _log_turn(client_id, phone_number, user_text, reply, call_sid)
             return _resp(200, {"ok": True, "reply": reply})
 
@@ -641,7 +1035,7 @@ def handler(event, context):
             return _resp(200, {"ok": True, "id": "system", "content": content})
 
         if method == "PUT" and path == "/prompt":
-            body = json.loads(event.get("body") or "{}")
+            body = _loads(event.get("body") or "{}")
             content = body.get("content")
             if not isinstance(content, str) or not content.strip():
                 return _resp(400, {"ok": False, "error": "content (markdown) required"})
@@ -654,7 +1048,7 @@ def handler(event, context):
             return _resp(200, {"ok": True, "config": cfg})
 
         if method == "PUT" and path == "/func-config":
-            body = json.loads(event.get("body") or "{}")
+            body = _loads(event.get("body") or "{}")
             cfg = body.get("config")
             if not isinstance(cfg, dict):
                 return _resp(400, {"ok": False, "error": "config (object) required"})
@@ -667,13 +1061,32 @@ def handler(event, context):
             return _resp(200, {"ok": True, "config": cfg})
 
         if method == "PUT" and path == "/ext-tools":
-            body = json.loads(event.get("body") or "{}")
+            body = _loads(event.get("body") or "{}")
             cfg = body.get("config")
             if not isinstance(cfg, dict):
                 return _resp(400, {"ok": False, "error": "config (object) required"})
             _put_ext_tools(client_id, cfg)
             return _resp(200, {"ok": True})
 
+        # Update several configs at once (keys: system, functions, ext-tools)
+        if method == "PUT" and path == "/configs":
+            body = _loads(event.get("body") or "{}")
+            updates: Dict[str, Any] = {}
+            if "system" in body:
+                content = body.get("system")
+                if not isinstance(content, str) or not content.strip():
+                    return _resp(400, {"ok": False, "error": "system (markdown) required"})
+                updates["system"] = content
+            for pid in ("functions", "ext-tools"):
+                if pid in body:
+                    if not isinstance(body.get(pid), dict):
+                        return _resp(400, {"ok": False, "error": f"{pid} (object) required"})
+                    updates[pid] = body.get(pid)
+            if not updates:
+                return _resp(400, {"ok": False, "error": "system, functions or ext-tools required"})
+            _put_prompts_batch(client_id, updates)
+            return _resp(200, {"ok": True, "updated": list(updates)})
+
         # Chat logs (CloudWatch) endpoint
         if method == "GET" and path == "/chat-logs":
             q = event.get("queryStringParameters") or {}
@@ -699,24 +1112,42 @@ def handler(event, context):
                 start_time_ms = now_ms - minutes * 60 * 1000
 
             try:
-                logs = boto3.client("logs")
-                resp = logs.filter_log_events(
+                logs = _get_logs_client()
+                now_s = int(time.time())
+                qid = logs.start_query(
                     logGroupName=LOG_GROUP_NAME,
-                    startTime=start_time_ms,
+                    startTime=start_time_ms // 1000,
+                    endTime=now_s + 1,
+                    queryString=(
+                        "fields @timestamp, @ingestionTime, @message, @logStream, @ptr"
+                        # oldest first, like FilterLogEvents: the first `limit` events after startTimeMs
+                        f" | sort @timestamp asc | limit {limit}"
+                    ),
                     limit=limit,
-                )
-                events = resp.get("events", [])
-                items = [
-                    {
-                        "timestamp": e.get("timestamp"),
-                        "ingestionTime": e.get("ingestionTime"),
-                        "message": e.get("message"),
-                        "logStreamName": e.get("logStreamName"),
-                        "eventId": e.get("eventId"),
-                    }
-                    for e in events
-                ]
-                return _resp(200, {"ok": True, "items": items})
+                )["queryId"]
+                # Insights runs the query server-side; poll briefly for completion
+                deadline = time.monotonic() + LOGS_QUERY_MAX_WAIT_SECS
+                delay = 0.1
+                while True:
+                    res = logs.get_query_results(queryId=qid)
+                    status = res.get("status")
+                    if status not in ("Scheduled", "Running"):
+                        break
+                    if time.monotonic() >= deadline:
+                        try:
+                            logs.stop_query(queryId=qid)
+                        except Exception:
+                            pass
+                        # partial rows may not be the first `limit` events; don't pass them off as complete
+                        items = [_insights_row_to_item(r) for r in res.get("results", [])]
+                        return _resp(504, {"ok": False, "error": "logs query timed out", "complete": False, "items": items})
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.5)
+                if status != "Complete":
+                    # Failed / Cancelled / Timeout / Unknown
+                    return _resp(502, {"ok": False, "error": f"logs query {status}"})
+                items = [_insights_row_to_item(r) for r in res.get("results", [])]
+                return _resp(200, {"ok": True, "items": items, "complete": True})
             except Exception as e:
                 return _resp(500, {"ok": False, "error": str(e)})
 
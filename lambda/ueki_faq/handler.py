@@ -1,54 +1,158 @@
+import base64
 import json
 import os
 from datetime import datetime, timezone
 
 import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 import auth
 
+try:  # optional: bundled via a layer when available
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> str:
+        # default=str covers Decimal from the Table resource
+        return json.dumps(obj, ensure_ascii=False, default=str)
+
+    _loads = json.loads
+
 AWS_REGION = os.getenv("AWS_REGION", "ap-northeast-1")
 FAQ_TABLE_NAME = os.getenv("FAQ_TABLE_NAME", "ueki-faq")
-
-_ddb = boto3.resource("dynamodb", region_name=AWS_REGION)
+FAQ_LIST_DEFAULT_LIMIT = 200
+FAQ_LIST_MAX_LIMIT = 1000
+FAQ_BULK_MAX_ITEMS = 1000
+
+# Keep-alive pool reused across warm invocations (saves a TLS handshake per call)
+_DDB_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=10,
+    retries={"mode": "standard", "total_max_attempts": 3},
+)
+_ddb = boto3.resource("dynamodb", region_name=AWS_REGION, config=_DDB_CONFIG)
 _table = _ddb.Table(FAQ_TABLE_NAME)
 
 
+def _encode_cursor(key: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii") + b"=" * (-len(cursor) % 4)))
+    except (ValueError, UnicodeError):
+        return None
+    # FAQ keys are client_id + question, both strings
+    if not isinstance(key, dict) or set(key) != {"client_id", "question"}:
+        return None
+    if not all(isinstance(v, str) for v in key.values()):
+        return None
+    return key
+
+
 def _now_iso():
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 
+# Shared by every response; never mutate
+_HEADERS = {
+    "content-type": "application/json; charset=utf-8",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+}
+
+
 def _resp(status: int, body: dict):
     return {
         "statusCode": status,
-        "headers": {
-            "content-type": "application/json; charset=utf-8",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body, ensure_ascii=False),
+        "headers": _HEADERS,
+        "body": _dumps(body),
     }
 
 
+_OPTIONS_RESP = _resp(200, {"ok": True})
+
+
+def _parse_body(event) -> dict:
+    b = event.get("body")
+    return _loads(b) if b else {}
+
+
 def handler(event, context):
     try:
-        client_id = auth.get_client_id(event)
-        
         http = event.get("requestContext", {}).get("http", {})
         method = http.get("method", "GET").upper()
+        # CORS preflight: answer before auth or any other work
+        if method == "OPTIONS":
+            return _OPTIONS_RESP
+
+        client_id = auth.get_client_id(event)
         path = http.get("path", "/")
 
-        if method == "OPTIONS":
-            return _resp(200, {"ok": True})
+        if method == "POST" and path == "/faqs/bulk":
+            # bulk create/overwrite via BatchWriteItem (25 items per request)
+            body = _parse_body(event)
+            entries = body.get("items")
+            if not isinstance(entries, list) or not entries:
+                return _resp(400, {"ok": False, "error": "items (list) required"})
+            if len(entries) > FAQ_BULK_MAX_ITEMS:
+                return _resp(400, {"ok": False, "error": f"at most {FAQ_BULK_MAX_ITEMS} items per request"})
+            if any(
+                not isinstance(e, dict)
+                or not isinstance(e.get("question"), str)
+                or not e["question"]
+                or e.get("answer") is None
+                for e in entries
+            ):
+                return _resp(400, {"ok": False, "error": "each item requires a non-empty string question and an answer"})
+            now = _now_iso()
+            with _table.batch_writer(overwrite_by_pkeys=["client_id", "question"]) as bw:
+                for e in entries:
+                    bw.put_item(Item={
+                        "client_id": client_id,
+                        "question": e["question"],
+                        "answer": e["answer"],
+                        "created_at": now,
+                        "updated_at": now,
+                    })
+            return _resp(200, {"ok": True, "count": len(entries)})
 
         if method == "GET" and path.startswith("/faqs"):
-            # list: Use Query instead of Scan for tenant isolation
-            from boto3.dynamodb.conditions import Key
-            resp = _table.query(
-                KeyConditionExpression=Key("client_id").eq(client_id),
-                Limit=200
-            )
-            return _resp(200, {"ok": True, "items": resp.get("Items", [])})
+            # list: Query on the tenant partition, paged with an opaque cursor
+            q = event.get("queryStringParameters") or {}
+            try:
+                limit = int(q.get("limit") or FAQ_LIST_DEFAULT_LIMIT)
+            except ValueError:
+                limit = FAQ_LIST_DEFAULT_LIMIT
+            limit = max(1, min(FAQ_LIST_MAX_LIMIT, limit))
+            start_key = None
+            if q.get("cursor"):
+                start_key = _decode_cursor(q["cursor"])
+                if start_key is None or start_key.get("client_id") != client_id:
+                    return _resp(400, {"ok": False, "error": "invalid cursor"})
+            # `limit` is what the caller sees; each Query asks only for what is
+            # still missing so a 1 MB-truncated page is continued, not refetched
+            items = []
+            while True:
+                kwargs = {
+                    "KeyConditionExpression": Key("client_id").eq(client_id),
+                    "Limit": limit - len(items),
+                }
+                if start_key:
+                    kwargs["ExclusiveStartKey"] = start_key
+                resp = _table.query(**kwargs)
+                items.extend(resp.get("Items", []))
+                start_key = resp.get("LastEvaluatedKey")
+                if not start_key or len(items) >= limit:
+                    break
+            return _resp(200, {"ok": True, "items": items, "next": _encode_cursor(start_key) if start_key else None})
 
         if path.startswith("/faq"):
             # Path params
@@ -58,17 +162,18 @@ def handler(event, context):
                 question = parts[2]
 
             if method == "POST" and path == "/faq":
-                body = json.loads(event.get("body") or "{}")
+                body = _parse_body(event)
                 q = body.get("question")
                 a = body.get("answer")
                 if not q or a is None:
                     return _resp(400, {"ok": False, "error": "question and answer required"})
+                now = _now_iso()
                 item = {
                     "client_id": client_id,
                     "question": q,
                     "answer": a,
-                    "created_at": _now_iso(),
-                    "updated_at": _now_iso()
+                    "created_at": now,
+                    "updated_at": now
                 }
                 # Condition: question must not exist FOR THIS CLIENT
                 _table.put_item(
@@ -87,7 +192,7 @@ def handler(event, context):
                 return _resp(200, {"ok": True, "item": item})
 
             if method == "PUT" and question:
-                body = json.loads(event.get("body") or "{}")
+                body = _parse_body(event)
                 a = body.get("answer")
                 if a is None:
                     return _resp(400, {"ok": False, "error": "answer required"})
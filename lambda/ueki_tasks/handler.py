@@ -3,43 +3,97 @@ import os
 from datetime import datetime, timezone
 
 import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 import auth
 
+try:  # optional: bundled via a layer when available
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> str:
+        # default=str covers Decimal from the Table resource
+        return json.dumps(obj, ensure_ascii=False, default=str)
+
+    _loads = json.loads
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-northeast-1")
 TABLE_NAME = os.getenv("TASKS_TABLE_NAME", "ueki-tasks")
-_ddb = boto3.resource("dynamodb")
+# Keep-alive pool reused across warm invocations (saves a TLS handshake per call)
+_DDB_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=10,
+    retries={"mode": "standard", "total_max_attempts": 3},
+)
+_ddb = boto3.resource("dynamodb", region_name=AWS_REGION, config=_DDB_CONFIG)
 _table = _ddb.Table(TABLE_NAME)
+# Low-level client for the PUT path: values go over the wire pre-typed ({"S": ...})
+# instead of through the resource's TypeSerializer
+_ddb_client = boto3.client("dynamodb", region_name=AWS_REGION, config=_DDB_CONFIG)
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+def _to_av(value):
+    # task fields are strings; anything else keeps the resource's typing
+    return {"S": value} if isinstance(value, str) else _serializer.serialize(value)
+
+def _from_item(item: dict) -> dict:
+    return {k: v["S"] if "S" in v else _deserializer.deserialize(v) for k, v in item.items()}
+
+# Updatable task fields for PUT: (attribute, body key, legacy body key)
+_FIELDS = (
+    ("request", "request", "requirement"),
+    ("start_datetime", "start_datetime", "start_date"),
+    ("phone_number", "phone_number", "phone"),
+    ("address", "address", None),
+)
+# attribute -> (SET clause, name placeholder, value placeholder), built once
+_FIELD_EXPR = {f: (f"#{f} = :{f}", f"#{f}", f":{f}") for f, _, _ in _FIELDS}
 
 def _now_iso():
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
+# Shared by every response; never mutate
+_HEADERS = {
+    "content-type": "application/json; charset=utf-8",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+}
+
 def _resp(status: int, body: dict):
     return {
         "statusCode": status,
-        "headers": {
-            "content-type": "application/json; charset=utf-8",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body, ensure_ascii=False),
+        "headers": _HEADERS,
+        "body": _dumps(body),
     }
 
+_OPTIONS_RESP = _resp(200, {"ok": True})
+
+def _parse_body(event) -> dict:
+    b = event.get("body")
+    return _loads(b) if b else {}
+
 def handler(event, context):
     try:
-        client_id = auth.get_client_id(event)
-        
         http = event.get("requestContext", {}).get("http", {})
         method = http.get("method", "GET").upper()
-        path = http.get("path", "/")
-
+        # CORS preflight: answer before auth or any other work
         if method == "OPTIONS":
-            return _resp(200, {"ok": True})
+            return _OPTIONS_RESP
+
+        client_id = auth.get_client_id(event)
+        path = http.get("path", "/")
 
         # List tasks
         if method == "GET" and path == "/tasks":
             # Use Query instead of Scan for tenant isolation
-            from boto3.dynamodb.conditions import Key
             r = _table.query(
                 KeyConditionExpression=Key("client_id").eq(client_id),
                 Limit=200
@@ -53,7 +107,7 @@ def handler(event, context):
                 name = parts[2]
 
             if method == "POST" and path == "/task":
-                body = json.loads(event.get("body") or "{}")
+                body = _parse_body(event)
                 nm = body.get("name")
                 phone = body.get("phone_number") or body.get("phone") or ""
                 address = body.get("address") or ""
@@ -61,6 +115,7 @@ def handler(event, context):
                 req = body.get("request") or body.get("requirement") or ""
                 if not nm:
                     return _resp(400, {"ok": False, "error": "name required"})
+                now = _now_iso()
                 item = {
                     "client_id": client_id,
                     "name": nm,
@@ -68,8 +123,8 @@ def handler(event, context):
                     "address": address,
                     "request": req,
                     "start_datetime": start,
-                    "created_at": _now_iso(),
-                    "updated_at": _now_iso(),
+                    "created_at": now,
+                    "updated_at": now,
                 }
                 _table.put_item(
                     Item=item,
@@ -86,42 +141,36 @@ def handler(event, context):
                 return _resp(200, {"ok": True, "item": it})
 
             if method == "PUT" and name:
-                body = json.loads(event.get("body") or "{}")
+                body = _parse_body(event)
                 expr_parts = []
-                expr_attr_values = {":updated_at": _now_iso()}
+                expr_attr_values = {":updated_at": {"S": _now_iso()}}
                 expr_attr_names = {"#n": "name", "#updated_at": "updated_at"}
 
                 # Accept new fields and legacy aliases
-                updates = {
-                    "request": body.get("request") if "request" in body else body.get("requirement"),
-                    "start_datetime": body.get("start_datetime") if "start_datetime" in body else body.get("start_date"),
-                    "phone_number": body.get("phone_number") if "phone_number" in body else body.get("phone"),
-                    "address": body.get("address") if "address" in body else None,
-                }
-
-                for field, value in updates.items():
+                for field, key, legacy in _FIELDS:
+                    value = body.get(key) if key in body else (body.get(legacy) if legacy else None)
                     if value is None:
                         continue
-                    alias = f"#{field}"
-                    valkey = f":{field}"
-                    expr_parts.append(f"{alias} = {valkey}")
+                    clause, alias, valkey = _FIELD_EXPR[field]
+                    expr_parts.append(clause)
                     expr_attr_names[alias] = field
-                    expr_attr_values[valkey] = value
+                    expr_attr_values[valkey] = _to_av(value)
 
                 if not expr_parts:
                     return _resp(400, {"ok": False, "error": "nothing to update"})
 
                 expr_parts.append("#updated_at = :updated_at")
 
-                r = _table.update_item(
-                    Key={"client_id": client_id, "name": name},
+                r = _ddb_client.update_item(
+                    TableName=TABLE_NAME,
+                    Key={"client_id": {"S": client_id}, "name": {"S": name}},
                     UpdateExpression="SET " + ", ".join(expr_parts),
                     ExpressionAttributeValues=expr_attr_values,
                     ExpressionAttributeNames=expr_attr_names,
                     ConditionExpression="attribute_exists(#n)",
                     ReturnValues="ALL_NEW",
                 )
-                return _resp(200, {"ok": True, "item": r.get("Attributes")})
+                return _resp(200, {"ok": True, "item": _from_item(r.get("Attributes") or {})})
 
             if method == "DELETE" and name:
                 _table.delete_item(
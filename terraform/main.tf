@@ -220,6 +220,67 @@ resource "aws_dynamodb_table" "app_tasks" {
   }
 }
 
+# 5. Phones Table: app-phones
+# PK: client_id, SK: phone_number (distinct numbers per tenant, written with each call log)
+resource "aws_dynamodb_table" "app_phones" {
+  name         = "app-phones"
+  billing_mode = "PAY_PER_REQUEST"
+
+  hash_key  = "client_id"
+  range_key = "phone_number"
+
+  attribute {
+    name = "client_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "phone_number"
+    type = "S"
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = {
+    Project = "chat_api"
+    Env     = var.env
+  }
+}
+
+# ==============================================================================
+# S3 (Recordings)
+# ==============================================================================
+
+# Twilio recordings copied on first play; served to clients via presigned URLs
+resource "aws_s3_bucket" "recordings" {
+  bucket = "app-recordings-${data.aws_caller_identity.current.account_id}-${var.env}"
+
+  tags = {
+    Project = "chat_api"
+    Env     = var.env
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "recordings" {
+  bucket                  = aws_s3_bucket.recordings.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_cors_configuration" "recordings" {
+  bucket = aws_s3_bucket.recordings.id
+
+  cors_rule {
+    allowed_methods = ["GET", "HEAD"]
+    allowed_origins = ["*"]
+    allowed_headers = ["*"]
+  }
+}
+
 # ==============================================================================
 # IAM & Lambda
 # ==============================================================================
@@ -251,12 +312,13 @@ resource "aws_iam_role_policy" "app_lambda_policy" {
           "${aws_dynamodb_table.app_logs.arn}/index/*",
           aws_dynamodb_table.app_faq.arn,
           aws_dynamodb_table.app_prompts.arn,
-          aws_dynamodb_table.app_tasks.arn
+          aws_dynamodb_table.app_tasks.arn,
+          aws_dynamodb_table.app_phones.arn
         ]
       },
       {
         Effect = "Allow",
-        Action = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents", "logs:FilterLogEvents", "logs:GetLogEvents", "logs:DescribeLogStreams"],
+        Action = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents", "logs:FilterLogEvents", "logs:StartQuery", "logs:GetQueryResults", "logs:StopQuery", "logs:GetLogEvents", "logs:DescribeLogStreams"],
         Resource = ["*"]
       },
       {
@@ -268,6 +330,17 @@ resource "aws_iam_role_policy" "app_lambda_policy" {
         Effect = "Allow",
         Action = ["cognito-idp:GetUser"],
         Resource = [aws_cognito_user_pool.main.arn]
+      },
+      {
+        Effect = "Allow",
+        Action = ["s3:GetObject", "s3:PutObject"],
+        Resource = ["${aws_s3_bucket.recordings.arn}/recordings/*"]
+      },
+      {
+        # ListBucket lets HeadObject report 404 (instead of 403) for missing keys
+        Effect = "Allow",
+        Action = ["s3:ListBucket"],
+        Resource = [aws_s3_bucket.recordings.arn]
       }
     ]
   })
@@ -294,6 +367,7 @@ resource "aws_lambda_function" "app_chat" {
       FAQ_TABLE_NAME       = aws_dynamodb_table.app_faq.name
       PROMPTS_TABLE_NAME   = aws_dynamodb_table.app_prompts.name
       TASKS_TABLE_NAME     = aws_dynamodb_table.app_tasks.name
+      PHONES_TABLE_NAME    = aws_dynamodb_table.app_phones.name
       COGNITO_USER_POOL_ID = aws_cognito_user_pool.main.id
       OPENAI_API_KEY       = var.openai_api_key
       OPENAI_SECRET_NAME   = "UEKI_OPENAI_APIKEY"
@@ -319,6 +393,9 @@ resource "aws_lambda_function" "app_calllogs" {
   environment {
     variables = {
       CALL_LOGS_TABLE_NAME = aws_dynamodb_table.app_logs.name
+      PHONES_TABLE_NAME    = aws_dynamodb_table.app_phones.name
+      PHONES_INDEX_READY   = var.phones_index_ready ? "1" : ""
+      RECORDINGS_BUCKET    = aws_s3_bucket.recordings.bucket
       TWILIO_ACCOUNT_SID   = var.twilio_account_sid
       TWILIO_AUTH_TOKEN    = var.twilio_auth_token
       OPENAI_SECRET_NAME   = "UEKI_OPENAI_APIKEY"
@@ -448,6 +525,7 @@ resource "aws_apigatewayv2_route" "routes_chat" {
     "GET /prompt", "PUT /prompt", 
     "GET /func-config", "PUT /func-config",
     "GET /ext-tools", "PUT /ext-tools",
+    "PUT /configs",
     "GET /chat-logs"
   ])
   api_id    = aws_apigatewayv2_api.app.id
@@ -476,7 +554,7 @@ resource "aws_apigatewayv2_route" "routes_calllogs" {
 # FAQ Routes
 resource "aws_apigatewayv2_route" "routes_faq" {
   for_each = toset([
-    "GET /faqs", "POST /faq", "GET /faq/{proxy+}", "PUT /faq/{proxy+}", "DELETE /faq/{proxy+}"
+    "GET /faqs", "POST /faqs/bulk", "POST /faq", "GET /faq/{proxy+}", "PUT /faq/{proxy+}", "DELETE /faq/{proxy+}"
   ])
   api_id    = aws_apigatewayv2_api.app.id
   route_key = each.value
@@ -518,3 +596,40 @@ resource "aws_lambda_permission" "perm_tasks" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_apigatewayv2_api.app.execution_arn}/*/*"
 }
+
+# ==============================================================================
+# Warmer (EventBridge)
+# ==============================================================================
+
+# Periodic no-op ping so chat/calllogs keep a warm sandbox (handlers return early on {"warmer": true}).
+# Provisioned concurrency is the alternative if a guaranteed warm pool is needed.
+resource "aws_cloudwatch_event_rule" "lambda_warmer" {
+  name                = "app-lambda-warmer"
+  schedule_expression = "rate(5 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "warm_chat" {
+  rule  = aws_cloudwatch_event_rule.lambda_warmer.name
+  arn   = aws_lambda_function.app_chat.arn
+  input = jsonencode({ warmer = true })
+}
+
+resource "aws_cloudwatch_event_target" "warm_calllogs" {
+  rule  = aws_cloudwatch_event_rule.lambda_warmer.name
+  arn   = aws_lambda_function.app_calllogs.arn
+  input = jsonencode({ warmer = true })
+}
+
+resource "aws_lambda_permission" "warm_chat" {
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.app_chat.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_warmer.arn
+}
+
+resource "aws_lambda_permission" "warm_calllogs" {
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.app_calllogs.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_warmer.arn
+}
@@ -18,6 +18,16 @@ output "app_tasks_table" {
   description = "Application Tasks DynamoDB table"
 }
 
+output "app_phones_table" {
+  value       = aws_dynamodb_table.app_phones.name
+  description = "Per-tenant phone number index DynamoDB table"
+}
+
+output "recordings_bucket" {
+  value       = aws_s3_bucket.recordings.bucket
+  description = "S3 bucket holding cached Twilio recordings"
+}
+
 output "region" {
   value       = var.region
   description = "AWS region"
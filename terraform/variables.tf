@@ -44,3 +44,8 @@ variable "twilio_auth_token" {
   default     = "TO BE FILLED"
 }
 
+variable "phones_index_ready" {
+  type        = bool
+  description = "Serve GET /phones from app-phones (set true after running backfill_phones.py)"
+  default     = false
+}
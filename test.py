@@ -1,35 +1,78 @@
+import atexit
 import json
 import re
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
 from datetime import datetime, timezone
+from functools import cache
 from typing import Optional, List, Dict
 import boto3
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 from boto3.dynamodb.conditions import Key
-from openai import OpenAI
 from faq import list_faqs
 
-# OpenAIクライアントの初期化
-client = OpenAI()
+try:  # orjson があれば高速にパース（無ければ標準の json）
+    import orjson
 
-# システムプロンプトの読み込み
-with open("system_prompt.txt", "r", encoding="utf-8") as f:
-    SYSTEM_PROMPT = f.read()
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
-# セッション管理用の辞書（簡易実装）
-SESSIONS = {}
+# OpenAIクライアント（SDK の import ごと初回利用時まで遅延）
+_openai_client = None
+
+
+def _get_openai():
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        _openai_client = OpenAI()
+    return _openai_client
+
+
+# システムプロンプトの読み込み（初回のみ）。gen_system_prompt_const.py で生成した
+# 定数があればファイル I/O なしで使い、無ければ system_prompt.txt を読む。
+# 生成後に system_prompt.txt が編集されていたら（mtime/サイズが違えば）定数は使わない
+@cache
+def _system_prompt() -> str:
+    try:
+        from _system_prompt_const import SYSTEM_PROMPT, SOURCE_STAT
+    except ImportError:
+        SYSTEM_PROMPT = SOURCE_STAT = None
+    try:
+        st = os.stat("system_prompt.txt")
+    except OSError:
+        st = None
+    if SYSTEM_PROMPT is not None:
+        if st is None or SOURCE_STAT == (st.st_mtime_ns, st.st_size):
+            return SYSTEM_PROMPT
+        print("_system_prompt_const.py が古いため system_prompt.txt を読みます"
+              "（gen_system_prompt_const.py を再実行してください）", flush=True)
+    with open("system_prompt.txt", "r", encoding="utf-8") as f:
+        return f.read()
+
+# セッション管理用の辞書（簡易実装）。古いセッションから捨てて上限を保つ
+SESSIONS_MAX = 128
+SESSIONS: "OrderedDict[str, List[Dict]]" = OrderedDict()
+
+_RE_SPOKEN = re.compile(r"<ASSISTANT_SPOKEN_TEXT>\s*([\s\S]*?)\s*<JSON>", re.I)
+_RE_JSON = re.compile(r"<JSON>\s*([\s\S]*?)\s*$", re.I)
 
 def parse_bot_output(text: str):
     """AIの出力から発話テキストとJSONデータを分離する"""
     spoken = text
-    m_spoken = re.search(r"<ASSISTANT_SPOKEN_TEXT>\s*([\s\S]*?)\s*<JSON>", text, re.I)
-    m_json   = re.search(r"<JSON>\s*([\s\S]*?)\s*$", text, re.I)
+    m_spoken = _RE_SPOKEN.search(text)
+    m_json   = _RE_JSON.search(text)
     if m_spoken:
         spoken = m_spoken.group(1).strip()
     js = None
     if m_json:
         try:
-            js = json.loads(m_json.group(1))
+            js = _loads(m_json.group(1))
         except Exception:
             pass
     return spoken, js
@@ -60,14 +103,14 @@ def chat_with_bot(
 
     # セッション履歴の取得（外部履歴が指定されていればそれを優先）
     history = external_history if external_history is not None else SESSIONS.get(session_id, [])
-    messages: List[Dict] = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages: List[Dict] = [{"role": "system", "content": _system_prompt()}]
     if faq_kb_text:
         messages.append({"role": "system", "content": f"FAQ_KB\n{faq_kb_text}"})
     messages.extend([*history, {"role": "user", "content": user_text}])
 
     try:
         # OpenAI Responses API の呼び出し
-        resp = client.responses.create(
+        resp = _get_openai().responses.create(
             model="gpt-4o-mini",
             input=messages,
             max_output_tokens=1200,
@@ -77,8 +120,13 @@ def chat_with_bot(
         spoken, js = parse_bot_output(text)
         
         # セッション履歴の更新（システムプロンプトを除く）
-        new_history = [*messages[1:], {"role": "assistant", "content": text}]
-        SESSIONS[session_id] = new_history[-20:]  # 最新20件を保持
+        # 外部履歴（DynamoDB）を渡された場合は呼び出し側が保存するので持たない
+        if external_history is None:
+            new_history = [*messages[1:], {"role": "assistant", "content": text}]
+            SESSIONS[session_id] = new_history[-20:]  # 最新20件を保持
+            SESSIONS.move_to_end(session_id)
+            if len(SESSIONS) > SESSIONS_MAX:
+                SESSIONS.popitem(last=False)
         
         return {
             "ok": True, 
@@ -93,22 +141,25 @@ def chat_with_bot(
 _DDB_REGION = os.getenv("AWS_REGION", "ap-northeast-1")
 _DDB_TABLE_NAME = os.getenv("DDB_TABLE_NAME", "ueki-chatbot")
 
-_ddb_resource = None
-_ddb_table = None
+_DDB_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=10,
+    retries={"mode": "standard", "total_max_attempts": 3},
+)
+
 
-def _get_ddb_table():
-    global _ddb_resource, _ddb_table
-    if _ddb_table is not None:
-        return _ddb_table
+def _init_ddb_table():
+    """モジュール読み込み時に一度だけテーブルを生成（失敗時は None）"""
     try:
-        _ddb_resource = boto3.resource("dynamodb", region_name=_DDB_REGION)
-        _ddb_table = _ddb_resource.Table(_DDB_TABLE_NAME)
-        return _ddb_table
+        return boto3.resource("dynamodb", region_name=_DDB_REGION, config=_DDB_CONFIG).Table(_DDB_TABLE_NAME)
     except Exception:
         return None
 
+
+_ddb_table = _init_ddb_table()
+
 def log_turn_to_dynamodb(phone_number: str, user_text: str, assistant_text: str) -> bool:
-    table = _get_ddb_table()
+    table = _ddb_table
     if table is None:
         return False
     ts = datetime.now(timezone.utc).isoformat(timespec="seconds")
@@ -127,7 +178,7 @@ def log_turn_to_dynamodb(phone_number: str, user_text: str, assistant_text: str)
 
 def fetch_turns_from_dynamodb(phone_number: str, limit: int = 20) -> List[Dict]:
     """DynamoDBから最新の会話ターンを最大limit件取得（昇順で返す）。"""
-    table = _get_ddb_table()
+    table = _ddb_table
     if table is None:
         return []
     try:
@@ -138,7 +189,7 @@ def fetch_turns_from_dynamodb(phone_number: str, limit: int = 20) -> List[Dict]:
             Limit=limit,
         )
         items = resp.get("Items", [])
-        items.sort(key=lambda x: x.get("ts", ""))
+        items.reverse()  # ts は RANGE キーなので降順の逆順がそのまま昇順
         return items
     except (BotoCoreError, ClientError):
         return []
@@ -158,36 +209,77 @@ def build_history_messages_from_turns(turns: List[Dict]) -> List[Dict]:
 
 
 # =============== FAQ Lookup (DynamoDB) ===============
-def _fetch_all_faqs(max_pages: int = 10, page_limit: int = 200) -> List[Dict]:
-    """Retrieve FAQ items by paginating scans via list_faqs()."""
+FAQ_SCAN_SEGMENTS = 4
+
+
+def _scan_faq_segment(segment: int, total_segments: int, max_pages: int, page_limit: int) -> List[Dict]:
+    """Page through one parallel-scan segment via list_faqs()."""
     items: List[Dict] = []
     last_key: Optional[Dict] = None
-    pages = 0
-    while pages < max_pages:
-        res = list_faqs(limit=page_limit, last_evaluated_key=last_key)
+    for _ in range(max_pages):
+        res = list_faqs(
+            limit=page_limit,
+            last_evaluated_key=last_key,
+            fields=["question", "answer"],
+            segment=segment,
+            total_segments=total_segments,
+        )
         if not res.get("ok"):
             break
         items.extend(res.get("items", []))
         last_key = res.get("last_evaluated_key")
-        pages += 1
         if not last_key:
             break
     return items
 
+
+def _fetch_all_faqs(max_pages: int = 10, page_limit: int = 200) -> List[Dict]:
+    """Retrieve FAQ items with a parallel scan (one thread per segment)."""
+    n = FAQ_SCAN_SEGMENTS
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        pages = ex.map(lambda seg: _scan_faq_segment(seg, n, max_pages, page_limit), range(n))
+        return list(chain.from_iterable(pages))
+
+# FAQ は滅多に変わらないので KB テキストをプロセス内に保持（ウォームスタート間で再利用）
+FAQ_KB_TTL_SECS = 300
+_FAQ_CACHE: Dict[str, object] = {"text": None, "expires": 0.0}
+
+
 def build_faq_kb_text() -> str:
+    if _FAQ_CACHE["text"] is not None and time.monotonic() < _FAQ_CACHE["expires"]:
+        return _FAQ_CACHE["text"]
+    text = _build_faq_kb_text()
+    _FAQ_CACHE["text"] = text
+    _FAQ_CACHE["expires"] = time.monotonic() + FAQ_KB_TTL_SECS
+    return text
+
+
+def _build_faq_kb_text() -> str:
     faqs = _fetch_all_faqs()
     if not faqs:
         return ""
-    # JSONにして渡すとモデルが参照しやすい
-    try:
-        return json.dumps([
-            {"question": f.get("question"), "answer": f.get("answer")}
-            for f in faqs if f.get("question") and f.get("answer")
-        ], ensure_ascii=False)
-    except Exception:
-        # フォールバック: プレーンテキスト
-        lines = ["- Q: {q}\n  A: {a}".format(q=f.get("question"), a=f.get("answer")) for f in faqs]
-        return "\n".join(lines)
+    # Lambda (_load_faq_kb_text) と同じ「Q:/A:」ブロック形式。answer が数値
+    # （Decimal）等でも崩れないよう str() に揃える
+    return "\n\n".join(
+        f"Q: {q}\nA: {a}"
+        for f in faqs if (q := f.get("question")) and (a := f.get("answer"))
+    )
+
+
+# ウォームスタート間で使い回すスレッド（KB取得とログ書き込み用）
+_LOG_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+_pending_logs: List[Future] = []
+
+
+def _drain_pending_logs() -> None:
+    while _pending_logs:
+        try:
+            _pending_logs.pop().result()
+        except Exception:
+            pass
+
+
+atexit.register(_drain_pending_logs)
 
 
 def chat_with_logging(phone_number: str, user_text: str) -> str:
@@ -195,11 +287,14 @@ def chat_with_logging(phone_number: str, user_text: str) -> str:
     入力: phone_number, user_text
     出力: assistantの返答（文字列）。DynamoDBへ1ターン分を保存。
     """
-    # FAQナレッジを全件プロンプトへ投入
-    faq_kb = build_faq_kb_text()
+    # 前ターンのログ書き込みを待ってから履歴を読む
+    _drain_pending_logs()
+    # FAQナレッジ（全件）とDBの過去ログは独立なので並行して取得
+    kb_future = _LOG_EXECUTOR.submit(build_faq_kb_text)
+    turns = fetch_turns_from_dynamodb(phone_number=phone_number, limit=20)
+    faq_kb = kb_future.result()
 
     # DBの過去ログを履歴として使用し、FAQ_KBも渡してLLMに問い合わせ
-    turns = fetch_turns_from_dynamodb(phone_number=phone_number, limit=20)
     db_history = build_history_messages_from_turns(turns)
     result = chat_with_bot(
         user_text=user_text,
@@ -211,8 +306,10 @@ def chat_with_logging(phone_number: str, user_text: str) -> str:
         return result.get("error", "Error")
 
     assistant_spoken: Optional[str] = result.get("spoken") or result.get("raw") or ""
-    # ログ保存（失敗しても会話は継続）
-    log_turn_to_dynamodb(phone_number=phone_number, user_text=user_text, assistant_text=assistant_spoken)
+    # ログ保存はバックグラウンドで（失敗しても会話は継続）
+    _pending_logs.append(_LOG_EXECUTOR.submit(
+        log_turn_to_dynamodb, phone_number=phone_number, user_text=user_text, assistant_text=assistant_spoken,
+    ))
     return assistant_spoken
 
 def clear_session(session_id: str = "default"):